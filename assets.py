@@ -0,0 +1,228 @@
+import hashlib
+import json
+import os
+import pygame
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+# -------------------------
+# Asset cache
+# -------------------------
+BAKED_DIR = "baked"
+BAKED_VERSION = 1
+
+
+class AssetCache:
+    """Decodes every image once and hands back shared, converted Surfaces.
+
+    Entries are keyed by (path, size, flip, tint, alpha). Scaled, flipped and
+    tinted variants are derived from the cached source image, so the disk is
+    only read the first time a path is requested. Once the cached pixels go
+    over budget_bytes the least recently used entries are dropped.
+
+    Surfaces handed out are shared: callers must not draw on them.
+    """
+
+    def __init__(self, budget_bytes=192 * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.disk_loads = 0
+        self.baked_loads = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def image(self, path, size=None, flip=False, tint=None, alpha=True):
+        key = _key(path, size, flip, tint, alpha)
+        surf = self._entries.get(key)
+        if surf is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return surf
+        self.misses += 1
+        return self._build(key)
+
+    def _build(self, key):
+        path, size, flip, tint, alpha = key
+        if size is None and not flip and tint is None:
+            surf = pygame.image.load(path)
+            surf = surf.convert_alpha() if alpha else surf.convert()
+            self.disk_loads += 1
+        else:
+            source = self._entries.get((path, None, False, None, alpha))
+            if source is None:
+                source = self._build((path, None, False, None, alpha))
+            surf = source
+            if size is not None:
+                surf = pygame.transform.scale(surf, size)
+            if flip:
+                surf = pygame.transform.flip(surf, True, False)
+            if tint is not None:
+                if surf is source:
+                    surf = surf.copy()
+                surf.fill(tint, special_flags=pygame.BLEND_RGBA_MULT)
+        self._store(key, surf)
+        return surf
+
+    def preload(self, specs, workers=4, progress=None):
+        """Decode and resample many images on a thread pool.
+
+        specs are (path, size, flip, tint, alpha) tuples (trailing items
+        optional, same meaning as for image()). Each file is decoded once,
+        off the main thread, and every requested variant is resampled there
+        too; only convert/convert_alpha and tinting run on the calling
+        thread, which must own the display. progress(done, total) is called
+        on the calling thread after each file.
+        """
+        by_path = {}
+        for spec in specs:
+            key = _key(*spec)
+            if key not in self._entries:
+                by_path.setdefault(key[0], {})[key] = None
+        total = len(by_path)
+        if not total:
+            return
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_decode_variants, path, list(keys)) for path, keys in by_path.items()]
+            for done, future in enumerate(as_completed(futures), 1):
+                for key, surf in future.result():
+                    surf = surf.convert_alpha() if key[4] else surf.convert()
+                    if key[3] is not None:
+                        surf.fill(key[3], special_flags=pygame.BLEND_RGBA_MULT)
+                    self._store(key, surf)
+                self.disk_loads += 1
+                if progress:
+                    progress(done, total)
+
+    def load_baked(self, bake_dir=BAKED_DIR):
+        """Load the textures written by bake() whose source PNG is unchanged.
+
+        Baked pixels are already at their final size, so they only need a
+        convert. Entries whose source file is missing or has a different
+        content hash are skipped; preload()/image() then fall back to the
+        PNG. Returns the number of textures loaded.
+        """
+        try:
+            with open(os.path.join(bake_dir, "textures.json")) as f:
+                manifest = json.load(f)
+            with open(os.path.join(bake_dir, "textures.bin"), "rb") as f:
+                blob = memoryview(f.read())
+        except (OSError, ValueError):
+            return 0
+        if manifest.get("version") != BAKED_VERSION:
+            return 0
+        hashes = {}
+        loaded = 0
+        for entry in manifest["entries"]:
+            path = entry["path"]
+            if path not in hashes:
+                hashes[path] = _file_hash(path)
+            if hashes[path] != entry["hash"]:
+                continue
+            key = _key(path, entry["size"], entry["flip"], _tint_key(entry["tint"]), entry["alpha"])
+            if key in self._entries:
+                continue
+            pixels = blob[entry["offset"]:entry["offset"] + entry["length"]]
+            surf = pygame.image.frombuffer(pixels, entry["dims"], "RGBA" if key[4] else "RGB")
+            self._store(key, surf.convert_alpha() if key[4] else surf.convert())
+            loaded += 1
+        self.baked_loads += loaded
+        return loaded
+
+    def _store(self, key, surf):
+        self._entries[key] = surf
+        self.used_bytes += _surface_bytes(surf)
+        while self.used_bytes > self.budget_bytes and len(self._entries) > 1:
+            _, old = self._entries.popitem(last=False)
+            self.used_bytes -= _surface_bytes(old)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.used_bytes = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_loads": self.disk_loads,
+            "baked_loads": self.baked_loads,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self.used_bytes,
+        }
+
+
+def _key(path, size=None, flip=False, tint=None, alpha=True):
+    return (path, _size_key(size), bool(flip), tint, alpha)
+
+
+def bake(specs, bake_dir=BAKED_DIR):
+    """Write every spec (as for preload()) at its final size to bake_dir.
+
+    Pixels are stored raw (RGBA, or RGB for alpha=False) in one
+    textures.bin, indexed by textures.json together with the content hash of
+    each source PNG. Needs no display. Returns the number of textures.
+    """
+    keys = {}
+    for spec in specs:
+        key = _key(*spec)
+        keys.setdefault(key[0], {})[key] = None
+    os.makedirs(bake_dir, exist_ok=True)
+    entries = []
+    offset = 0
+    with open(os.path.join(bake_dir, "textures.bin"), "wb") as blob:
+        for path, variants in keys.items():
+            digest = _file_hash(path)
+            for key, surf in _decode_variants(path, list(variants)):
+                if key[3] is not None:
+                    surf = surf.copy()
+                    surf.fill(key[3], special_flags=pygame.BLEND_RGBA_MULT)
+                pixels = pygame.image.tobytes(surf, "RGBA" if key[4] else "RGB")
+                blob.write(pixels)
+                entries.append({
+                    "path": path, "size": key[1], "flip": key[2], "tint": key[3], "alpha": key[4],
+                    "hash": digest, "dims": surf.get_size(), "offset": offset, "length": len(pixels),
+                })
+                offset += len(pixels)
+    with open(os.path.join(bake_dir, "textures.json"), "w") as f:
+        json.dump({"version": BAKED_VERSION, "entries": entries}, f, indent=1)
+    return len(entries)
+
+
+def _file_hash(path):
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def _decode_variants(path, keys):
+    # worker thread: no display calls (convert) allowed here
+    source = pygame.image.load(path)
+    variants = []
+    for key in keys:
+        surf = source
+        if key[1] is not None:
+            surf = pygame.transform.scale(surf, key[1])
+        if key[2]:
+            surf = pygame.transform.flip(surf, True, False)
+        variants.append((key, surf))
+    return variants
+
+
+def _tint_key(tint):
+    return None if tint is None else tuple(tint)
+
+
+def _size_key(size):
+    if size is None:
+        return None
+    return (int(size[0]), int(size[1]))
+
+
+def _surface_bytes(surf):
+    return surf.get_pitch() * surf.get_height()
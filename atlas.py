@@ -0,0 +1,81 @@
+import pygame
+
+
+# -------------------------
+# Texture atlas
+# -------------------------
+class TextureAtlas:
+    """Packs many small sprites into one surface.
+
+    sprites maps a name to a Surface. They are packed in rows (tallest
+    first) into a single SRCALPHA surface at most max_width wide, with
+    padding pixels between them. rects[name] is the sprite's area in
+    ``surface``; region(surf) finds it from the original Surface, which is
+    how a SpriteBatch redirects ordinary blits into the atlas.
+    """
+
+    def __init__(self, sprites, max_width=512, padding=1):
+        order = sorted(sprites.items(), key=lambda item: -item[1].get_height())
+        self.rects = {}
+        x = y = row_h = width = 0
+        for name, surf in order:
+            w, h = surf.get_size()
+            if x and x + w > max_width:
+                x, y, row_h = 0, y + row_h + padding, 0
+            self.rects[name] = pygame.Rect(x, y, w, h)
+            x += w + padding
+            row_h = max(row_h, h)
+            width = max(width, x - padding)
+        self.surface = pygame.Surface((max(1, width), max(1, y + row_h)), pygame.SRCALPHA)
+        self.surface.fill((0, 0, 0, 0))
+        self._regions = {}
+        for name, surf in order:
+            self.surface.blit(surf, self.rects[name], special_flags=pygame.BLEND_RGBA_MAX)
+            self._regions[surf] = self.rects[name]
+        if pygame.display.get_surface() is not None:
+            self.surface = self.surface.convert_alpha()
+
+    def region(self, surf):
+        return self._regions.get(surf)
+
+    def __contains__(self, name):
+        return name in self.rects
+
+    def __len__(self):
+        return len(self.rects)
+
+
+# -------------------------
+# Sprite batch
+# -------------------------
+class SpriteBatch:
+    """Collects blits and issues them as one Surface.blits() call.
+
+    Has the same blit(source, dest) signature as a Surface, so entity
+    draw(surf, ...) methods can draw into a batch unchanged. Sources that
+    are in the atlas are drawn from the atlas surface; anything else is
+    passed through as-is. Nothing is drawn until flush(), so flush one
+    batch per layer, in draw order.
+    """
+
+    def __init__(self, atlas=None):
+        self.atlas = atlas
+        self.items = []
+        self.flushes = 0
+        self.sprites = 0
+
+    def blit(self, source, dest, area=None):
+        region = self.atlas.region(source) if self.atlas and area is None else None
+        if region is not None:
+            self.items.append((self.atlas.surface, dest, region))
+        elif area is not None:
+            self.items.append((source, dest, area))
+        else:
+            self.items.append((source, dest))
+
+    def flush(self, surf):
+        if self.items:
+            surf.blits(self.items, doreturn=False)
+            self.sprites += len(self.items)
+            self.flushes += 1
+            self.items.clear()
@@ -0,0 +1,31 @@
+"""Offline texture bake.
+
+Writes every image the game and its level use, at the exact size it is
+drawn, to baked/, so a launch only has to convert them instead of decoding
+and resampling the PNGs. Textures whose source PNG changed since the bake are
+detected by content hash and loaded from the PNG as before; rerun this
+after editing art.
+
+    python bake_assets.py
+"""
+import argparse
+import sys
+import time
+
+import assets
+from level import load_level
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default=assets.BAKED_DIR, help="output directory (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    import game
+    start = time.perf_counter()
+    count = assets.bake(game.image_specs(load_level(game.LEVEL_PATH)), args.out)
+    print(f"baked {count} textures to {args.out}/ in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
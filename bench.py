@@ -0,0 +1,187 @@
+"""Headless benchmark for the game simulation.
+
+Steps scripted scenarios through game.simulate_tick as fast as possible on
+SDL's dummy video/audio drivers (no window, GPU or sound card needed) and
+reports ticks per second, the time spent in each profiler phase and the memory
+allocated while running. Exits 1 if a scenario makes the world layers hold more
+entities than its layout plus one beanstalk per seed (game.world_metrics).
+
+    python bench.py
+    python bench.py idle "laser corridor" --ticks 5000 --render --json bench.json
+    python bench.py --fail-below 2000      # exit 1 if any scenario is slower
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+import pygame
+
+import game
+
+
+# -------------------------
+# Scenarios
+# -------------------------
+# Each scenario sets up a fresh game and returns inputs(tick) -> (held keys, pressed keys).
+
+def idle():
+    return lambda tick: ((), ())
+
+
+def laser_corridor():
+    game.player.rect.topleft = (260, 1102)
+
+    def inputs(tick):
+        # keep walking through the beams instead of stopping at the first hit
+        game.player.dead = False
+        held = (pygame.K_d,) if (tick // 90) % 2 == 0 else (pygame.K_a,)
+        return held, ()
+    return inputs
+
+
+def past_with_trees():
+    game.handle_keydown(pygame.K_s)
+
+    def inputs(tick):
+        held = [pygame.K_d] if (tick // 150) % 2 == 0 else [pygame.K_a]
+        if tick % 40 == 0:
+            held.append(pygame.K_w)
+        return held, ()
+    return inputs
+
+
+def stress_1000_blocks():
+    rng = random.Random(1234)
+    for _ in range(1000):
+        x = rng.randrange(0, game.WORLD_WIDTH - 40)
+        y = rng.randrange(0, game.WORLD_HEIGHT - 100)
+        game.present_objects.add(game.Block(x, y, rng.randrange(10, 40), rng.randrange(10, 40)))
+
+    def inputs(tick):
+        held = [pygame.K_d] if (tick // 120) % 2 == 0 else [pygame.K_a]
+        if tick % 30 == 0:
+            held.append(pygame.K_w)
+        return held, ()
+    return inputs
+
+
+def laser_grid():
+    # 400 emitters in a 20x20 grid over the middle of the present
+    for row in range(20):
+        for col in range(20):
+            rect = pygame.Rect(850 + col * 50, 450 + row * 35, 8, 30)
+            game.lasers_present.append(game.Laser(rect, axis='v', off_duration=1500, warning_duration=500,
+                                                  on_duration=1000, start_offset=(row * 20 + col) * 37))
+    game.build_laser_fields()
+    game.player.rect.topleft = (1000, 1102)
+
+    def inputs(tick):
+        game.player.dead = False
+        held = [pygame.K_d] if (tick // 100) % 2 == 0 else [pygame.K_a]
+        if tick % 50 == 0:
+            held.append(pygame.K_w)
+        return held, ()
+    return inputs
+
+
+SCENARIOS = {
+    "idle": idle,
+    "laser corridor": laser_corridor,
+    "laser grid": laser_grid,
+    "past with trees": past_with_trees,
+    "1000-block stress level": stress_1000_blocks,
+}
+
+
+# -------------------------
+# Runner
+# -------------------------
+def run_ticks(scenario, ticks, render=False):
+    """Run a scenario; returns (entities the world should hold at most, most it held)."""
+    game.new_game()
+    inputs = SCENARIOS[scenario]()
+    limit = game.world_limit()
+    keys = game.HeldKeys()
+    for tick in range(ticks):
+        held, pressed = inputs(tick)
+        keys.keys = set(held)
+        game.simulate_tick(keys, pressed)
+        if render:
+            game.render(game.frame)
+    return limit, sum(layer["peak"] for layer in game.world_metrics().values())
+
+
+def bench(scenario, ticks, render=False):
+    profiler = game.profiler
+    profiler.reset()
+    profiler.enabled = True
+    start = time.perf_counter()
+    world_limit, world_peak = run_ticks(scenario, ticks, render)
+    elapsed = time.perf_counter() - start
+    profiler.enabled = False
+
+    # allocations are measured on a separate, shorter run: tracemalloc slows everything down
+    alloc_ticks = min(ticks, 600)
+    tracemalloc.start()
+    run_ticks(scenario, alloc_ticks, render=render)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "scenario": scenario,
+        "ticks": ticks,
+        "ticks_per_second": ticks / elapsed,
+        "system_ms_per_tick": {name: total * 1000 / ticks for name, total in profiler.totals.items()},
+        "alloc_kb_retained": current / 1024,
+        "alloc_kb_peak": peak / 1024,
+        "alloc_ticks": alloc_ticks,
+        "world_peak": world_peak,
+        "world_limit": world_limit,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scenarios", nargs="*", help="scenario names (default: all)")
+    parser.add_argument("--ticks", type=int, default=3000)
+    parser.add_argument("--render", action="store_true", help="also render every tick off-screen")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--fail-below", type=float, help="exit 1 if a scenario runs fewer ticks/s than this")
+    args = parser.parse_args(argv)
+
+    names = args.scenarios or list(SCENARIOS)
+    for name in names:
+        if name not in SCENARIOS:
+            parser.error(f"unknown scenario {name!r} (choose from {', '.join(SCENARIOS)})")
+
+    game.init(headless=True)
+    results = []
+    for name in names:
+        result = bench(name, args.ticks, args.render)
+        results.append(result)
+        systems = ", ".join(f"{k} {v:.3f}" for k, v in result["system_ms_per_tick"].items())
+        print(f"{name:26} {result['ticks_per_second']:10.0f} ticks/s   "
+              f"alloc {result['alloc_kb_peak']:.0f} KB peak / {result['alloc_kb_retained']:.0f} KB retained")
+        print(f"{'':26} ms/tick: {systems}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    grown = [r["scenario"] for r in results if r["world_peak"] > r["world_limit"]]
+    if grown:
+        print("World grew past its layout:", ", ".join(grown))
+        return 1
+    if args.fail_below is not None:
+        slow = [r["scenario"] for r in results if r["ticks_per_second"] < args.fail_below]
+        if slow:
+            print("Below", args.fail_below, "ticks/s:", ", ".join(slow))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import pygame
+
+
+# -------------------------
+# Camera culling
+# -------------------------
+class Culler:
+    """Filters one frame's draws against the visible world rect.
+
+    Call begin() once per frame with the camera; then visible(), filter()
+    and query() decide what gets drawn and count drawn/culled entities per
+    kind ("Block", "Laser", ...) for profiling.
+    """
+
+    def __init__(self):
+        self.view = pygame.Rect(0, 0, 0, 0)
+        self.drawn = {}
+        self.culled = {}
+
+    def begin(self, camera_x, camera_y, width, height):
+        self.view = pygame.Rect(camera_x, camera_y, width, height)
+        self.drawn = {}
+        self.culled = {}
+
+    def count(self, kind, drawn, culled):
+        self.drawn[kind] = self.drawn.get(kind, 0) + drawn
+        self.culled[kind] = self.culled.get(kind, 0) + culled
+
+    def visible(self, kind, rect):
+        seen = self.view.colliderect(rect)
+        self.count(kind, int(seen), int(not seen))
+        return seen
+
+    def filter(self, kind, entities, rect_of=None):
+        """Entities whose rect (or rect_of(entity)) is on screen, in order."""
+        view = self.view
+        if rect_of is None:
+            kept = [e for e in entities if view.colliderect(e.rect)]
+        else:
+            kept = [e for e in entities if view.colliderect(rect_of(e))]
+        self.count(kind, len(kept), len(entities) - len(kept))
+        return kept
+
+    def query(self, kind, layer):
+        """Like filter() for a WorldLayer, using its spatial index."""
+        view = self.view
+        kept = [e for e in layer.query(view) if view.colliderect(e.rect)]
+        self.count(kind, len(kept), len(layer) - len(kept))
+        return kept
+
+    def save(self):
+        """This frame's counts so far, for restore() on a later frame."""
+        return dict(self.drawn), dict(self.culled)
+
+    def restore(self, saved):
+        """Replace the counts with ones from save(), e.g. for a scene reused from a cache."""
+        self.drawn, self.culled = dict(saved[0]), dict(saved[1])
+
+    def totals(self):
+        return sum(self.drawn.values()), sum(self.culled.values())
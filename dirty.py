@@ -0,0 +1,84 @@
+import pygame
+
+
+# -------------------------
+# Dirty-rect presentation
+# -------------------------
+class DirtyTracker:
+    """Stands in for a Surface and remembers every rect drawn to it.
+
+    blit(), blits() and fill() are forwarded to the wrapped surface and the
+    affected rects collected in ``rects``; everything else (get_size(),
+    get_width(), ...) is passed through. Draw code that only uses those
+    calls can draw into a tracker unchanged.
+    """
+
+    def __init__(self, surface):
+        self.surface = surface
+        self.rects = []
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        rect = self.surface.blit(source, dest, area, special_flags)
+        if rect:
+            self.rects.append(rect)
+        return rect
+
+    def blits(self, blit_sequence, doreturn=True):
+        rects = self.surface.blits(blit_sequence, doreturn=True)
+        self.rects.extend(rect for rect in rects if rect)
+        return rects if doreturn else None
+
+    def fill(self, color, rect=None, special_flags=0):
+        rect = self.surface.fill(color, rect, special_flags)
+        if rect:
+            self.rects.append(rect)
+        return rect
+
+    def __getattr__(self, name):
+        return getattr(self.surface, name)
+
+
+class DirtyPresenter:
+    """Redraws only what changed while the static part of the frame is the same.
+
+    present() is given a key identifying the static scene (camera position,
+    timeline, ...), a draw_scene(surf) that draws that scene and a
+    draw_dynamic(surf) that draws everything else. When the key changes the
+    scene is drawn into a cached surface and the whole frame is redrawn.
+    Otherwise only the rects the dynamic drawables covered last frame are
+    restored from the cache before they are drawn again. Every dynamic
+    pixel lies inside one of those rects, so nothing is blended twice.
+    """
+
+    def __init__(self):
+        self.scene = None
+        self.key = None
+        self.rects = []
+        self.full_frames = 0
+        self.partial_frames = 0
+
+    def invalidate(self):
+        # the screen was drawn by someone else: next frame is a full redraw
+        self.key = None
+
+    def present(self, screen, key, draw_scene, draw_dynamic):
+        """Draw a frame on screen; returns the rects to display.update(), or None to flip."""
+        if self.scene is None or self.scene.get_size() != screen.get_size():
+            self.scene = pygame.Surface(screen.get_size()).convert()
+            self.key = None
+        tracker = DirtyTracker(screen)
+        if key != self.key:
+            draw_scene(self.scene)
+            self.key = key
+            screen.blit(self.scene, (0, 0))
+            draw_dynamic(tracker)
+            self.rects = tracker.rects
+            self.full_frames += 1
+            return None
+        for rect in self.rects:
+            screen.blit(self.scene, rect, rect)
+        draw_dynamic(tracker)
+        dirty = self.rects + tracker.rects
+        self.rects = tracker.rects
+        self.partial_frames += 1
+        return dirty
@@ -0,0 +1,76 @@
+import json
+import queue
+import sys
+import threading
+import time
+from collections import Counter
+
+
+# -------------------------
+# Event log
+# -------------------------
+DEBUG, INFO, WARNING = 10, 20, 30
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING}
+
+
+class EventLog:
+    """Structured gameplay events, written off the game thread.
+
+    emit(level, kind, **fields) drops events below ``level`` straight away,
+    counts the rest per kind in ``counts`` (cheap analytics that need no
+    sink) and, once open() has been called, puts them on a queue. A daemon
+    thread drains the queue and writes one JSON object per line, so a slow
+    disk or console never stalls a frame. open("-") writes readable lines to
+    stderr instead. close() flushes everything that was emitted.
+    """
+
+    def __init__(self, level=INFO):
+        self.level = level
+        self.counts = Counter()
+        self.dropped = 0
+        self._queue = None
+        self._thread = None
+
+    def emit(self, level, kind, **fields):
+        if level < self.level:
+            return
+        self.counts[kind] += 1
+        if self._queue is not None:
+            fields["kind"] = kind
+            fields["level"] = level
+            fields["time"] = time.time()
+            try:
+                self._queue.put_nowait(fields)
+            except queue.Full:
+                self.dropped += 1
+
+    def open(self, path, max_pending=10000):
+        self.close()
+        self._queue = queue.Queue(max_pending)
+        self._thread = threading.Thread(target=self._write, args=(path, self._queue), name="event-log", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        if self._queue is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._queue = self._thread = None
+
+    def _write(self, path, pending):
+        out = sys.stderr if path == "-" else open(path, "a", encoding="utf-8")
+        try:
+            while True:
+                event = pending.get()
+                if event is None:
+                    break
+                if out is sys.stderr:
+                    extra = " ".join(f"{k}={v}" for k, v in event.items() if k not in ("kind", "level", "time", "tick", "message"))
+                    out.write(f"[{event.get('tick', '-')}] {event['kind']}: {event.get('message', '')} {extra}\n")
+                else:
+                    out.write(json.dumps(event, default=str) + "\n")
+                if pending.empty():
+                    out.flush()
+        finally:
+            if out is not sys.stderr:
+                out.close()
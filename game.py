@@ -1,35 +1,66 @@
-import pygame
+import os
 import sys
 import math
+import argparse
+
+import pygame
+
+from assets import AssetCache
+from world import WorldLayer
+from static_layer import StaticLayer
+from text import FontRegistry, TextCache, DebugOverlay
+from profiler import Profiler
+from culling import Culler
+from atlas import TextureAtlas, SpriteBatch
+from level import load_level
+from occupancy import OccupancyMap
+from rewind import RewindBuffer
+from events import EventLog, LEVELS, DEBUG, INFO, WARNING
+from dirty import DirtyPresenter
+from view import ViewScaler
+from triggers import Triggers, TIMELINE_CHANGED, ITEM_PICKED, SEED_PLACED, TREE_CHOPPED, REGION_ENTERED
+
+try:
+    from laser_field import LaserField
+except ImportError:  # numpy missing: lasers are checked one by one
+    LaserField = None
 
-pygame.init()
-pygame.mixer.init()
 # -------------------------
 # Screen setup
 # -------------------------
-WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Clocked In")
-clock = pygame.time.Clock()
+WIDTH, HEIGHT = 800, 600  # world pixels the camera shows, whatever the resolution; the HUD is laid out for it too
+screen = None  # the window, set by init()
+frame = None  # what the world is drawn into: the window itself, or a lower-resolution target scaled up to it
+view = ViewScaler(WIDTH, HEIGHT)  # draws the WIDTH x HEIGHT view onto a frame of another resolution
+clock = None
+assets = AssetCache()
+fonts = FontRegistry()
+text_cache = TextCache()
+profiler = Profiler()  # F3 toggles the overlay
+culler = Culler()
+presenter = DirtyPresenter()
+scene_culling = ({}, {})  # culler counts of the scene the presenter has cached
+events = EventLog()  # --log FILE writes it out; see log_event
+
+def log_event(kind, message="", level=INFO, **fields):
+    # instead of print(): queued for the writer thread, tagged with tick, position and timeline
+    if level >= events.level:
+        events.emit(level, kind, message=message, tick=sim_tick, pos=player.rect.topleft, timeline=current_time, **fields)
 
-pygame.mixer.music.load("ClockedIn-Theme.mp3")
-pygame.mixer.music.set_volume(0.7)
-pygame.mixer.music.play(-1)
 # -------------------------
-# World size
+# World size (set from the level by new_game)
 # -------------------------
 WORLD_WIDTH, WORLD_HEIGHT = 2400, 1200
-background_present = pygame.image.load("sunset.png").convert()
-background_past = pygame.image.load("sunrise.png").convert()
-
-# Scale to fit screen size (if needed)
-background_present = pygame.transform.scale(background_present, (WIDTH, HEIGHT))
-background_past = pygame.transform.scale(background_past, (WIDTH, HEIGHT))
+LEVEL_PATH = os.path.join("levels", "level1.json")
+level = None  # compiled level, see level.py
 
 # -------------------------
 # Laser class (from earlier)
 # -------------------------
 class Laser:
+    __slots__ = ("rect", "axis", "off_duration", "warning_duration", "on_duration", "cycle_length",
+                 "active_in_timelines", "start_time")
+
     def __init__(self, rect, axis='h', off_duration=2000, warning_duration=1500, on_duration=2500, active_in_timelines=('present',), start_offset=0):
         self.rect = rect.copy()
         self.axis = axis
@@ -38,7 +69,7 @@ class Laser:
         self.on_duration = on_duration
         self.cycle_length = off_duration + warning_duration + on_duration
         self.active_in_timelines = tuple(active_in_timelines)
-        self.start_time = pygame.time.get_ticks() + start_offset
+        self.start_time = start_offset  # on the simulation clock (sim_time), not wall time
 
     def state_at(self, now_ms):
         t = (now_ms - self.start_time) % self.cycle_length
@@ -58,44 +89,83 @@ class Laser:
             return True
         return False
 
-    def draw(self, surf, camera_x, camera_y, now_ms, timeline):
-        if timeline not in self.active_in_timelines:
-            return
+    def visual_at(self, now_ms):
+        # (glow alpha, beam color, beam width), or None while off
         state, t = self.state_at(now_ms)
-        screen_rect = pygame.Rect(self.rect.x - camera_x, self.rect.y - camera_y, max(2, self.rect.w), max(2, self.rect.h))
-
         if state == 'off':
-            return
+            return None
         elif state == 'warning':
-            pulse = 40 + int(70 * (0.5 + 0.5 * math.sin((t / max(1, self.warning_duration)) * math.pi * 2)))
-            surf_l = pygame.Surface((screen_rect.w, screen_rect.h), pygame.SRCALPHA)
-            surf_l.fill((255, 0, 0, pulse))
-            surf.blit(surf_l, (screen_rect.x, screen_rect.y))
-            if self.axis == 'h':
-                pygame.draw.line(surf, (120, 0, 0), (screen_rect.x, screen_rect.y + screen_rect.h // 2),
-                                 (screen_rect.x + screen_rect.w, screen_rect.y + screen_rect.h // 2), 1)
-            else:
-                pygame.draw.line(surf, (120, 0, 0), (screen_rect.x + screen_rect.w // 2, screen_rect.y),
-                                 (screen_rect.x + screen_rect.w // 2, screen_rect.y + screen_rect.h), 1)
-        elif state == 'on':
-            surf_l = pygame.Surface((screen_rect.w, screen_rect.h), pygame.SRCALPHA)
-            surf_l.fill((255, 0, 0, 220))
-            surf.blit(surf_l, (screen_rect.x, screen_rect.y))
-            if self.axis == 'h':
-                pygame.draw.line(surf, (255, 80, 80), (screen_rect.x, screen_rect.y + screen_rect.h // 2),
-                                 (screen_rect.x + screen_rect.w, screen_rect.y + screen_rect.h // 2), 3)
-            else:
-                pygame.draw.line(surf, (255, 80, 80), (screen_rect.x + screen_rect.w // 2, screen_rect.y),
-                                 (screen_rect.x + screen_rect.w // 2, screen_rect.y + screen_rect.h), 3)
+            step = int(t * LASER_PULSE_STEPS / max(1, self.warning_duration)) % LASER_PULSE_STEPS
+            return LASER_PULSE_ALPHAS[step], (120, 0, 0), 1
+        return 220, (255, 80, 80), 3
+
+    def draw(self, surf, camera_x, camera_y, now_ms, timeline):
+        draw_lasers(surf, [self], camera_x, camera_y, now_ms, timeline)
+
+
+# warning pulse is quantized so every glow surface can be cached
+LASER_PULSE_STEPS = 16
+LASER_PULSE_ALPHAS = [40 + int(70 * (0.5 + 0.5 * math.sin(step / LASER_PULSE_STEPS * math.pi * 2)))
+                      for step in range(LASER_PULSE_STEPS)]
+laser_glows = {}  # (w, h, alpha) -> filled SRCALPHA surface
+
+def laser_glow(w, h, alpha):
+    glow = laser_glows.get((w, h, alpha))
+    if glow is None:
+        glow = pygame.Surface((w, h), pygame.SRCALPHA)
+        glow.fill((255, 0, 0, alpha))
+        laser_glows[(w, h, alpha)] = glow
+    return glow
+
+def draw_lasers(surf, lasers, camera_x, camera_y, now_ms, timeline):
+    # all glows in one blits() call, then the beams; lasers off screen are skipped
+    view = pygame.Rect(camera_x, camera_y, surf.get_width(), surf.get_height())
+    glows = []
+    beams = []
+    for laser in lasers:
+        if timeline not in laser.active_in_timelines or not view.colliderect(laser.rect):
+            continue
+        visual = laser.visual_at(now_ms)
+        if visual is None:
+            continue
+        alpha, color, width = visual
+        screen_rect = pygame.Rect(laser.rect.x - camera_x, laser.rect.y - camera_y, max(2, laser.rect.w), max(2, laser.rect.h))
+        glows.append((laser_glow(screen_rect.w, screen_rect.h, alpha), screen_rect.topleft))
+        # the pixels pygame.draw.line would cover from one end's middle to the other's
+        if laser.axis == 'h':
+            beams.append((color, (screen_rect.x, screen_rect.centery - (width - 1) // 2, screen_rect.w + 1, width)))
+        else:
+            beams.append((color, (screen_rect.centerx - (width - 1) // 2, screen_rect.y, width, screen_rect.h + 1)))
+    surf.blits(glows, doreturn=False)
+    for color, beam in beams:
+        surf.fill(color, beam)
+
+# below this many lasers the per-laser loop beats NumPy's call overhead
+LASER_FIELD_MIN_LASERS = 32
+laser_fields = {}  # timeline -> LaserField, for timelines with many lasers
+
+def build_laser_fields():
+    # call again after changing lasers_past / lasers_present
+    global laser_fields
+    laser_fields = {}
+    if LaserField is None:
+        return
+    for timeline, lasers in (("past", lasers_past), ("present", lasers_present)):
+        if len(lasers) >= LASER_FIELD_MIN_LASERS:
+            laser_fields[timeline] = LaserField(lasers)
 
 # -------------------------
 # Player Class
 # -------------------------
 class Player:
+    __slots__ = ("spawn_point", "img", "rect", "prev_pos", "vel_x", "vel_y", "on_ground", "dead", "climbing",
+                 "facing_right")
+
     def __init__(self, x, y, img):
         self.spawn_point = (x, y)
         self.img = img
         self.rect = img.get_rect(topleft=(x, y))
+        self.prev_pos = self.rect.topleft  # position at the previous sim tick, for interpolation
         self.vel_x = 0
         self.vel_y = 0
         self.on_ground = False
@@ -105,15 +175,15 @@ class Player:
 
 
     def respawn(self):
-        print("Respawn: moving player to spawn")
+        log_event("player.respawn", "moving player to spawn")
         self.rect.topleft = self.spawn_point
+        self.prev_pos = self.spawn_point
         self.vel_x = 0
         self.vel_y = 0
         self.dead = False
         self.climbing = False
 
-    def handle_input(self):
-        keys = pygame.key.get_pressed()
+    def handle_input(self, keys):
         self.vel_x = 0
         if keys[pygame.K_a]:
             self.vel_x = -4
@@ -137,9 +207,10 @@ class Player:
                 self.vel_y = 10
 
     def move(self, objects):
-        # horizontal collisions
+        # horizontal collisions (only test blocks in the cells the move sweeps over)
+        start = self.rect.copy()
         self.rect.x += self.vel_x
-        for obj in objects:
+        for obj in objects.query(start.union(self.rect)):
             if isinstance(obj, Block):
                 obj = obj.rect
             if self.rect.colliderect(obj):
@@ -149,9 +220,10 @@ class Player:
                     self.rect.left = obj.right
 
         # vertical
+        start = self.rect.copy()
         self.rect.y += self.vel_y
         self.on_ground = False
-        for obj in objects:
+        for obj in objects.query(start.union(self.rect)):
             if isinstance(obj, Block):
                 obj = obj.rect
             if self.rect.colliderect(obj):
@@ -176,144 +248,98 @@ class Player:
             self.vel_y = 0
 
     def check_climb(self, climbables):
-        in_climbable = any(self.rect.colliderect(c.rect) for c in climbables)
+        in_climbable = any(self.rect.colliderect(c.rect) for c in climbables.query(self.rect))
         if in_climbable and not self.on_ground:
             self.climbing = True
         else:
             self.climbing = False
 
-    def update(self, objects, climbables):
+    def update(self, objects, climbables, keys):
+        self.prev_pos = self.rect.topleft
         if not self.dead:
             self.check_climb(climbables)
-            self.handle_input()
+            self.handle_input(keys)
             self.apply_gravity()
             self.move(objects)
 
-    def draw(self, surf, camera_x, camera_y):
-        img = self.img.copy()
-        if self.climbing:
-            img.fill((0, 255, 0, 100), special_flags=pygame.BLEND_RGBA_MULT)
-        if self.dead:
-            img.fill((255, 0, 0, 150), special_flags=pygame.BLEND_RGBA_MULT)
-        # surf.blit(img, (self.rect.x - camera_x, self.rect.y - camera_y))
-        player_img = pygame.image.load("player.png").convert_alpha()
-        player_img = pygame.transform.scale(player_img, (32, 48))
-        if self.facing_right:
-            surf.blit(player_img, (self.rect.x - camera_x, self.rect.y - camera_y))
-        else:
-            surf.blit(pygame.transform.flip(player_img, True, False), (self.rect.x - camera_x, self.rect.y - camera_y)) 
-
+    def render_rect(self, alpha):
+        # rect between the last two sim ticks; alpha is how far into the next tick we are
+        x = self.prev_pos[0] + (self.rect.x - self.prev_pos[0]) * alpha
+        y = self.prev_pos[1] + (self.rect.y - self.prev_pos[1]) * alpha
+        return pygame.Rect(round(x), round(y), self.rect.w, self.rect.h)
 
-# -------------------------
-# Load player image
-# -------------------------
-try:
-    player_img = pygame.image.load("player.png").convert_alpha()
-    player_img = pygame.transform.scale(player_img, (32, 48))
-except Exception as e:
-    print("Warning: couldn't load player.png:", e)
-    player_img = pygame.Surface((32, 48), pygame.SRCALPHA)
-    player_img.fill((200, 200, 0))
+    def draw(self, surf, camera_x, camera_y, alpha=1.0):
+        player_img = assets.image("player.png", (32, 48), flip=not self.facing_right)
+        pos = self.render_rect(alpha)
+        surf.blit(player_img, (pos.x - camera_x, pos.y - camera_y))
 
-player = Player(900, 1100, player_img)
 
 class Block:
+    __slots__ = ("rect", "image")
+
     def __init__(self, x, y, w, h, image=None):
+        # image is a path; every entity drawing it at the same size shares the cached surface
         self.rect = pygame.Rect(x, y, w, h)
-        self.image = None
-        if image:
-            self.image = pygame.transform.scale(image, (w, h))
+        self.image = assets.image(image, self.rect.size) if image else None
 
     def draw(self, surf, camera_x, camera_y):
         if self.image:
             surf.blit(self.image, (self.rect.x - camera_x, self.rect.y - camera_y))
         else:
-            pygame.draw.rect(surf, (150, 150, 150),  # fallback gray
-                             pygame.Rect(self.rect.x - camera_x,
-                                         self.rect.y - camera_y,
-                                         self.rect.w, self.rect.h))
+            surf.fill((150, 150, 150),  # fallback gray
+                      pygame.Rect(self.rect.x - camera_x,
+                                  self.rect.y - camera_y,
+                                  self.rect.w, self.rect.h))
 
 class Climbable:
+    __slots__ = ("rect", "image")
+
     def __init__(self, x, y, w, h, image=None):
+        # image is a path; every entity drawing it at the same size shares the cached surface
         self.rect = pygame.Rect(x, y, w, h)
-        self.image = None
-        if image:
-            self.image = pygame.transform.scale(image, (w, h))
+        self.image = assets.image(image, self.rect.size) if image else None
 
     def draw(self, surf, camera_x, camera_y):
         if self.image:
             surf.blit(self.image, (self.rect.x - camera_x, self.rect.y - camera_y))
         else:
-            pygame.draw.rect(surf, (0, 255, 0),  # fallback gray
-                             pygame.Rect(self.rect.x - camera_x,
-                                         self.rect.y - camera_y,
-                                         self.rect.w, self.rect.h))
+            surf.fill((0, 255, 0),  # fallback gray
+                      pygame.Rect(self.rect.x - camera_x,
+                                  self.rect.y - camera_y,
+                                  self.rect.w, self.rect.h))
 
 # -------------------------
 # World Objects
 # -------------------------
 
-tree_img = pygame.image.load("bigTree.png").convert_alpha()
-specialBlock = Block(1350, 400, 300, 750, tree_img) # BigTree
-def build_world():
-    # Past
-    cliff_img = pygame.image.load("cliff.png").convert_alpha()
-    cliff_img = pygame.transform.scale(cliff_img, (800, 500))
-    cliff2_img = pygame.image.load("cliffM.png").convert_alpha()
-    cliff2_img = pygame.transform.scale(cliff2_img, (800, 500))
-    ground_img = pygame.image.load("ground2.png").convert_alpha()
-    ground_img = pygame.transform.scale(ground_img, (800, 500))
-    rock_img = pygame.image.load("rocks.png").convert_alpha()
-    rock_img = pygame.transform.scale(rock_img, (1000, 500))
-    bPlatform_img = pygame.image.load("bluePlatform.png").convert_alpha()
-    bPlatform_img = pygame.transform.scale(bPlatform_img, (1000, 500))
-    gPlatform_img = pygame.image.load("actualBluePlatform.png").convert_alpha()
-    gPlatform_img = pygame.transform.scale(gPlatform_img, (1000, 500))
-    vault_img = pygame.image.load("vaultDoor.png").convert_alpha()
-    vault_img = pygame.transform.scale(vault_img, (300, 500))
-
-
-    past = [
-        Block(0, 1150, WORLD_WIDTH, 50, ground_img),  # ground at bottom
-        Block(0, 400, 800, 500, cliff_img),         # tall cliff on left
-        Block(2000, 400, 400, 800, cliff2_img),        # tall cliff on right
-        Block(200, 825, 400, 350, rock_img),       # cave blockage
-        
-        # Block(1900, 1080, 200, 70),
-        # Block(1600, 600, 200, 40),
-    ]
-
-    # Present
-    
-    present = [
-        Block(0, 1150, WORLD_WIDTH, 50, ground_img),  # ground
-        Block(0, 400, 800, 500, cliff_img),         # tall cliff
-        Block(650, 893, 100, 260, vault_img),        # vault door
-        Block(2000, 400, 400, 800, cliff2_img),        # tall cliff on right
-
-
-        Block(1225, 650, 200, 40, bPlatform_img), # floating platform
-        Block(1600, 600, 200, 40, gPlatform_img), # floating platform
-        specialBlock, # BigTree
-    ]
-
-    return past, present
-
-past_objects, present_objects = build_world()
-
-# -------------------------
-# Climbable vines
-# -------------------------
-vines_img = pygame.image.load("vines.png").convert_alpha()
-vines_img = pygame.transform.scale(vines_img, (800, 500))
-climbables_past = [Climbable(770, 400, 50, 500, vines_img)]
-climbables_present = [Climbable(1975, 400, 50, 750, vines_img)]
-
+def build_world(level):
+    # each block asks the asset cache for its image at its own size (preloaded, see level_images)
+    layers = {}
+    for kind, cls in (("blocks", Block), ("climbables", Climbable)):
+        for timeline, entries in level[kind].items():
+            layers[kind, timeline] = [cls(*rect, image) for rect, image in entries]
+    return layers
+
+def level_images(level):
+    # (path, size) of every image build_world/new_game will ask for, for preloading
+    specs = []
+    for kind in ("blocks", "climbables"):
+        for entries in level[kind].values():
+            specs += [(image, rect[2:]) for rect, image in entries if image]
+    for x, y, height, width, trunk, top in level["trees"]:
+        specs.append((trunk, (width, height)))
+        if top:
+            top_w, top_h = Tree.top_size(width, height)
+            specs.append((top, (int(top_w), int(top_h))))
+    return specs
 
 # -------------------------
 # Seed class (tracks created tree parts)
 # -------------------------
 class Seed:
+    __slots__ = ("original_pos", "rect", "picked_up", "placed", "grown_in_present", "placedInPresent",
+                 "tree_trunk", "tree_top")
+
     def __init__(self, x, y):
         self.original_pos = (x, y)
         self.rect = pygame.Rect(x, y, 32, 32)
@@ -326,12 +352,12 @@ class Seed:
         self.tree_top = None
 
     def reset(self):
-        print("Seed.reset(): removing any grown tree & resetting seed to original position")
+        log_event("seed.reset", "removing any grown tree & resetting seed to original position", DEBUG, seed=self.original_pos)
         # remove grown tree parts if present
         if self.tree_trunk is not None:
             if self.tree_trunk in climbables_present:
-                climbables_present.remove(self.tree_trunk)
-                print(" - removed trunk from climbables_present")
+                climbables_present.discard(self.tree_trunk)
+                log_event("seed.trunk_removed", "removed trunk from climbables_present", DEBUG, seed=self.original_pos)
             self.tree_trunk = None
         self.rect.topleft = self.original_pos
         self.picked_up = False
@@ -344,78 +370,50 @@ class Seed:
         if timeline == "past" and not self.picked_up and not self.placed:
             # pygame.draw.rect(surf, (255, 255, 0),
             #                  pygame.Rect(self.rect.x - camera_x, self.rect.y - camera_y, self.rect.width, self.rect.height))
-            seed_img = pygame.image.load("seed.png").convert_alpha()
-            seed_img = pygame.transform.scale(seed_img, (32, 32))
+            seed_img = assets.image("seed.png", (32, 32))
             surf.blit(seed_img, (self.rect.x - camera_x, self.rect.y - camera_y))
         # show placed seed marker in either timeline
         if (self.placed) and ((timeline == 'past' and self.grown_in_present) or (timeline == 'present' and self.placedInPresent)):
-            mound_img = pygame.image.load("mound.png").convert_alpha()
-            mound_img = pygame.transform.scale(mound_img, (32, 32))
+            mound_img = assets.image("mound.png", (32, 32))
             surf.blit(mound_img, (self.rect.x - camera_x, self.rect.y - camera_y + 10))
             # pygame.draw.rect(surf, (180, 120, 60),
             #                  pygame.Rect(self.rect.x - camera_x, self.rect.y - camera_y, self.rect.width, self.rect.height))
 
-# create one seed
-seed = Seed(110, 1100)
-seeds_past = [seed]
-inventory = []
-
-# -------------------------
-# Lasers
-# -------------------------
-# We'll create one horizontal laser in the present that spans across x=1000..1400 at y=900 (thin).
-# It will be absent in the past (only present).
-laser_rect_present1 = pygame.Rect(250, 900, 25, 250)  # thin horizontal rect
-laser1 = Laser(laser_rect_present1, axis='v', off_duration=2000, warning_duration=1000, on_duration=3000, active_in_timelines=('present',), start_offset=3000)
-
-laser_rect_present2 = pygame.Rect(350, 900, 25, 250)  # thin horizontal rect
-laser2 = Laser(laser_rect_present2, axis='v', off_duration=2000, warning_duration=1000, on_duration=3000, active_in_timelines=('present',), start_offset=2000)
-
-laser_rect_present3 = pygame.Rect(450, 900, 25, 250)  # thin horizontal rect
-laser3 = Laser(laser_rect_present3, axis='v', off_duration=2000, warning_duration=1000, on_duration=3000, active_in_timelines=('present',), start_offset=1000)
-
-laser_rect_present4 = pygame.Rect(550, 900, 25, 250)  # thin horizontal rect
-laser4 = Laser(laser_rect_present4, axis='v', off_duration=2000, warning_duration=1000, on_duration=3000, active_in_timelines=('present',), start_offset=0)
-
-
-# Add more laser instances if needed:
-# laser2 = Laser(pygame.Rect(...), axis='v', ...)
-lasers_present = [laser1, laser2, laser3, laser4]
-lasers_past = []
-
 # -------------------------
 # Tree class
 # -------------------------
 class Tree:
+    __slots__ = ("trunk", "top", "support", "rect", "alive", "linked_blocks")
+
     def __init__(self, x, y, height=120, width=50, trunk_img="treeTrunk.png", top_img="treeTop.png"):
-        trunk_img = pygame.image.load(trunk_img).convert_alpha()
-        trunk_img = pygame.transform.scale(trunk_img, (800, 500))
         self.trunk = Climbable(x, y - height, width, height, trunk_img) #pygame.Rect(x, y - height, width, height)
         self.top = None
 
         if top_img:
-            top_img = pygame.image.load(top_img).convert_alpha()
-            topWidth = 5/3 * width * 2; topHeight = height/2
-            top_img = pygame.transform.scale(top_img, (800, 500))
+            topWidth, topHeight = self.top_size(width, height)
             self.top = Block(x - topWidth/3, y - height - topHeight/2, topWidth, topHeight, top_img) #pygame.Rect(x - 10, y - height - 10, 5/3 * width, 10)
 
         self.support = Block(x + width/2 - 2.5, y - height, 5, height) #pygame.Rect(x + width/2 - 2.5, y - height, 5, height)  # small platform on top of trunk
+        self.rect = self.trunk.rect.union(self.top.rect) if self.top else self.trunk.rect.copy()  # drawn area, for culling
         self.alive = True
+        self.linked_blocks = []  # (layer, block) in the other timeline that go away when this tree is chopped
+
+    @staticmethod
+    def top_size(width, height):
+        return 5/3 * width * 2, height/2
 
     def add_to_world(self):
         if self.alive:
-            climbables_past.append(self.trunk)
+            climbables_past.add(self.trunk)
             if self.top:
-                past_objects.append(self.top)
-            past_objects.append(self.support)
+                past_objects.add(self.top)
+            past_objects.add(self.support)
 
     def remove_from_world(self):
-        if self.trunk in climbables_past:
-            climbables_past.remove(self.trunk)
-        if self.top and self.top in past_objects:
-            past_objects.remove(self.top)
-        if self.support in past_objects:
-            past_objects.remove(self.support)
+        climbables_past.discard(self.trunk)
+        if self.top:
+            past_objects.discard(self.top)
+        past_objects.discard(self.support)
     
     def kill(self):
         self.alive = False
@@ -434,6 +432,8 @@ class Tree:
 # Axe class
 # -------------------------
 class Axe:
+    __slots__ = ("rect", "picked_up")
+
     def __init__(self, x, y):
         self.rect = pygame.Rect(x, y, 40, 50)
         self.picked_up = False
@@ -443,32 +443,14 @@ class Axe:
 
     def draw(self, surf, camera_x, camera_y, timeline):
         if not self.picked_up and timeline == "present":
-            axe_img = pygame.image.load("axe.png").convert_alpha()
-            axe_img = pygame.transform.scale(axe_img, (40, 50))
+            axe_img = assets.image("axe.png", (40, 50))
             surf.blit(axe_img, (self.rect.x - camera_x, self.rect.y - camera_y))
-       
 
-# -------------------------
-# Setup example axe + pre-existing tree
-# -------------------------
-axe = Axe(250, 350)
-inventory = []
-trees = []
-
-# Example: add one pre-existing tree at x=1000, ground y=550
-tree1 = Tree(1100, 1150)
-tree2 = Tree(1400, 1150, trunk_img="bigTree.png", top_img=None, height=200, width=80)
-specialTree = tree2
-tree1.add_to_world()
-tree2.add_to_world()
-trees.append(tree1)
-trees.append(tree2)
 
 ## Star Class
-star_img = pygame.image.load("star.png").convert_alpha()
-star_img = pygame.transform.scale(star_img, (40, 40))  # adjust size
-
 class Star:
+    __slots__ = ("rect", "collected")
+
     def __init__(self, x, y):
         self.rect = pygame.Rect(x, y, 40, 40)
         self.collected = False
@@ -477,8 +459,25 @@ class Star:
         if not self.collected:
             surf.blit(star_img, (self.rect.x - camera_x, self.rect.y - camera_y))
 
-star = Star(1305, 600)  # position somewhere hard to reach
+def world_layers():
+    return {
+        "past_objects": past_objects,
+        "present_objects": present_objects,
+        "climbables_past": climbables_past,
+        "climbables_present": climbables_present,
+    }
+
+def world_counts():
+    # entity counts per timeline layer (debug overlay)
+    return {name: len(layer) for name, layer in world_layers().items()}
 
+def world_metrics():
+    # per layer: entities now and the most it has held at once (bench and soak checks)
+    return {name: {"count": len(layer), "peak": layer.peak} for name, layer in world_layers().items()}
+
+def world_limit():
+    # most entities the world should ever hold, from what is in it now: the layout plus one beanstalk per seed
+    return sum(world_counts().values()) + len(seeds_past)
 
 
 # -------------------------
@@ -498,24 +497,13 @@ def get_camera(player_rect):
     return camera_x, camera_y
 
 
-# HUD slot background
-slot_img = pygame.image.load("slot.png").convert_alpha()
-slot_img = pygame.transform.scale(slot_img, (50, 50))
-
-# Item icons
-seed_icon   = pygame.image.load("seed.png").convert_alpha()
-seed_icon = pygame.transform.scale(seed_icon, (40, 40))
-axe_icon    = pygame.image.load("axe.png").convert_alpha()
-axe_icon = pygame.transform.scale(axe_icon, (40, 40))
-bucket_icon = pygame.image.load("bucket.png").convert_alpha()
-bucket_icon = pygame.transform.scale(bucket_icon, (40, 40))
 
-def draw_hud(surf, inventory):
-    # HUD position
-    start_x = 20
-    start_y = 20
-    spacing = 60  # space between slots
+HUD_POS = (20, 20)
+HUD_SPACING = 60  # space between slots
+hud_surface = None
+hud_inventory = None  # inventory hud_surface was built for
 
+def build_hud(inventory):
     items = ["seed", "axe", "bucket"]
     icons = {
         "seed": seed_icon,
@@ -523,222 +511,804 @@ def draw_hud(surf, inventory):
         "bucket": bucket_icon
     }
 
+    hud = pygame.Surface((HUD_SPACING * (len(items) - 1) + slot_img.get_width(), slot_img.get_height()), pygame.SRCALPHA)
+    batch = SpriteBatch(sprite_atlas)
     for i, item in enumerate(items):
-        x = start_x + i * spacing
-        y = start_y
+        x = i * HUD_SPACING
 
         # Draw slot background
-        surf.blit(slot_img, (x, y))
+        batch.blit(slot_img, (x, 0))
 
         # If the item is in inventory, draw it
         if item in inventory:
-            surf.blit(icons[item], (x + 5, y + 5))  # small padding
-
-
-# -------------------------
-# Game loop
-# -------------------------
-current_time = "present"
-running = True
-victory = False
-teleport_sound = pygame.mixer.Sound("TeleportSound.mp3")
-teleport_sound.set_volume(0.1)
-darken_overlay = pygame.Surface((WIDTH, HEIGHT))
-darken_overlay.set_alpha(100)      # 0 = fully transparent, 255 = fully black
-darken_overlay.fill((0, 0, 0))
-
-while running:
-    now = pygame.time.get_ticks()
-
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-
-
-        # KEYDOWN handling (Q/E should be handled here so they trigger once per press)
-        if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_s and not player.dead:
-                # swap timeline first, then check if swap killed player
-                current_time = "past" if current_time == "present" else "present"
-                teleport_sound.play()
-                new_objects = past_objects if current_time == "past" else present_objects
-                if any(player.rect.colliderect(obj.rect) for obj in new_objects):
-                    player.dead = True
-                    print("Player died because they swapped into a block")
-            elif event.key == pygame.K_r and player.dead:
-                print("Player requested respawn")
-                player.respawn()
-                current_time = "present"
-                # reset seeds and remove any trees
-                for s in seeds_past:
-                    s.reset()
-                inventory.clear()
-                print(" - inventory cleared, seeds reset")
-            elif event.key == pygame.K_q:
-                if not axe.picked_up and player.rect.colliderect(axe.rect) and current_time == "present":
-                    axe.picked_up = True
-                    print("Picked up Axe!")
-
-                # pick up seed only in past
-                if current_time != "past":
-                    print("Q pressed but not in past - cannot pick seed here")
+            batch.blit(icons[item], (x + 5, 5))  # small padding
+    batch.flush(hud)
+    return hud
+
+hud_items = []  # what the HUD shows, kept up to date by refresh_hud
+
+def refresh_hud(**event):
+    # on pickups and placements, instead of scanning the seeds every frame
+    hud_items[:] = (["seed"] if inventory else []) + (["axe"] if axe.picked_up else [])
+
+def draw_hud(surf, inventory):
+    # composed once per inventory change, then a single blit
+    global hud_surface, hud_inventory
+    inventory = tuple(inventory)
+    if inventory != hud_inventory:
+        hud_surface = build_hud(inventory)
+        hud_inventory = inventory
+    surf.blit(hud_surface, HUD_POS)
+
+def draw_swap_indicator(surf, fatal):
+    # right of the item slots: would pressing S put the player inside a block?
+    label = "Swap: blocked" if fatal else "Swap: safe"
+    color = (230, 60, 60) if fatal else (120, 220, 120)
+    text = text_cache.render(fonts.get(None, 24), label, color)
+    surf.blit(text, (HUD_POS[0] + HUD_SPACING * 3, HUD_POS[1] + 15))
+
+# -------------------------
+# Loading
+# -------------------------
+# Every image the game asks the asset cache for outside the level, at the
+# size it is used (the level's own come from level_images, the screen-sized
+# backgrounds are added by image_specs). init() decodes these in parallel
+# behind a loading screen, so the first frame (and the first beanstalk /
+# flipped player) never waits on a PNG.
+PRELOAD_IMAGES = [
+    ("beanstalk.png", (40, 250)),
+    ("player.png", (32, 48)),
+    ("player.png", (32, 48), True),
+    ("seed.png", (32, 32)),
+    ("seed.png", (40, 40)),
+    ("mound.png", (32, 32)),
+    ("axe.png", (40, 50)),
+    ("axe.png", (40, 40)),
+    ("bucket.png", (40, 40)),
+    ("star.png", (40, 40)),
+    ("slot.png", (50, 50)),
+]
+
+def image_specs(level):
+    backgrounds = [(name, (WIDTH, HEIGHT), False, None, False) for name in ("sunset.png", "sunrise.png")]
+    return backgrounds + PRELOAD_IMAGES + level_images(level)
+
+def draw_loading_screen(done, total):
+    width, height = screen.get_size()
+    screen.fill((0, 0, 0))
+    bar = pygame.Rect(width // 4, height // 2, width // 2, 20)
+    pygame.draw.rect(screen, (80, 80, 80), bar, 2)
+    pygame.draw.rect(screen, (255, 215, 0), (bar.x + 2, bar.y + 2, (bar.w - 4) * done // max(1, total), bar.h - 4))
+    text = text_cache.render(fonts.get(None, 36), "Loading...", (255, 255, 255))
+    screen.blit(text, text.get_rect(midbottom=(width // 2, bar.y - 10)))
+    pygame.display.flip()
+    pygame.event.pump()  # keep the window responsive
+
+# -------------------------
+# Media (needs a display for convert/convert_alpha)
+# -------------------------
+def darkened(background, alpha=100):
+    # alpha: 0 = unchanged, 255 = fully black; drawn on a copy, the cached image is shared
+    overlay = pygame.Surface(background.get_size())
+    overlay.set_alpha(alpha)
+    overlay.fill((0, 0, 0))
+    background = background.copy()
+    background.blit(overlay, (0, 0))
+    return background
+
+def load_media(sound=True):
+    global background_present, background_past, star_img, slot_img, seed_icon, axe_icon, bucket_icon
+    global teleport_sound, debug_overlay, sprite_atlas, hud_inventory
+
+    # Scale to fit screen size (if needed), darkened once here rather than every frame
+    background_present = darkened(assets.image("sunset.png", (WIDTH, HEIGHT), alpha=False))
+    background_past = darkened(assets.image("sunrise.png", (WIDTH, HEIGHT), alpha=False))
+
+    star_img = assets.image("star.png", (40, 40))  # adjust size
+
+    # HUD slot background
+    slot_img = assets.image("slot.png", (50, 50))
+
+    # Item icons
+    seed_icon   = assets.image("seed.png", (40, 40))
+    axe_icon    = assets.image("axe.png", (40, 40))
+    bucket_icon = assets.image("bucket.png", (40, 40))
+
+    # small sprites share one surface so each layer is a single blits() call
+    sprite_atlas = TextureAtlas({
+        "slot": slot_img,
+        "seed icon": seed_icon,
+        "axe icon": axe_icon,
+        "bucket icon": bucket_icon,
+        "star": star_img,
+        "seed": assets.image("seed.png", (32, 32)),
+        "mound": assets.image("mound.png", (32, 32)),
+        "axe": assets.image("axe.png", (40, 50)),
+        "player": assets.image("player.png", (32, 48)),
+        "player flipped": assets.image("player.png", (32, 48), flip=True),
+    })
+    hud_inventory = None
+
+    teleport_sound = None
+    if sound:
+        teleport_sound = pygame.mixer.Sound("TeleportSound.mp3")
+        teleport_sound.set_volume(0.1)
+
+    debug_overlay = DebugOverlay(fonts.get(None, 20, system=True))
+
+
+# -------------------------
+# New game (builds the whole world; also used by headless runs)
+# -------------------------
+def new_game(level_path=None):
+    global player, past_objects, present_objects, climbables_past, climbables_present
+    global seed, seeds_past, inventory, lasers_present, lasers_past, axe, trees, star
+    global static_layers, swap_maps, rewind_buffer, current_time, victory, sim_tick, sim_time
+    global triggers, trees_stale
+    global level, WORLD_WIDTH, WORLD_HEIGHT
+
+    if level_path is not None or level is None:
+        level = load_level(level_path or LEVEL_PATH)
+    WORLD_WIDTH, WORLD_HEIGHT = level["world"]
+
+    try:
+        player_img = assets.image("player.png", (32, 48))
+    except Exception as e:
+        events.emit(WARNING, "asset.missing", message=f"couldn't load player.png: {e}", path="player.png")
+        player_img = pygame.Surface((32, 48), pygame.SRCALPHA)
+        player_img.fill((200, 200, 0))
+
+    player = Player(*level["spawn"], player_img)
+
+    layers = build_world(level)
+    past_objects = WorldLayer(WORLD_WIDTH, WORLD_HEIGHT, layers["blocks", "past"])
+    present_objects = WorldLayer(WORLD_WIDTH, WORLD_HEIGHT, layers["blocks", "present"])
+    climbables_past = WorldLayer(WORLD_WIDTH, WORLD_HEIGHT, layers["climbables", "past"])
+    climbables_present = WorldLayer(WORLD_WIDTH, WORLD_HEIGHT, layers["climbables", "present"])
+
+    seeds_past = [Seed(x, y) for x, y in level["seeds"]]
+    seed = seeds_past[0] if seeds_past else None
+    inventory = []
+
+    lasers_present, lasers_past = [], []
+    for rect, axis, off, warning, on, timelines, offset in level["lasers"]:
+        laser = Laser(pygame.Rect(rect), axis=axis, off_duration=off, warning_duration=warning, on_duration=on, active_in_timelines=timelines, start_offset=offset)
+        if "present" in timelines:
+            lasers_present.append(laser)
+        if "past" in timelines:
+            lasers_past.append(laser)
+    build_laser_fields()
+
+    axe = Axe(*level["axe"])
+    trees = []
+    for x, y, height, width, trunk, top in level["trees"]:
+        tree = Tree(x, y, height=height, width=width, trunk_img=trunk, top_img=top)
+        tree.add_to_world()
+        trees.append(tree)
+    for tree_index, (timeline, block_index) in level["links"]:
+        layer = past_objects if timeline == "past" else present_objects
+        trees[tree_index].linked_blocks.append((layer, layers["blocks", timeline][block_index]))
+
+    star = Star(*level["star"])
+
+    # blocks + climbables of each timeline baked into world tiles (see BAKE_STATIC_LAYERS)
+    static_layers = {
+        "past": StaticLayer(WORLD_WIDTH, WORLD_HEIGHT, [past_objects, climbables_past]),
+        "present": StaticLayer(WORLD_WIDTH, WORLD_HEIGHT, [present_objects, climbables_present]),
+    }
+
+    # solid cells of each timeline: swapping into one kills the player
+    swap_maps = {
+        "past": OccupancyMap(WORLD_WIDTH, WORLD_HEIGHT, past_objects, SWAP_MAP_CELL),
+        "present": OccupancyMap(WORLD_WIDTH, WORLD_HEIGHT, present_objects, SWAP_MAP_CELL),
+    }
+
+    # the last REWIND_SECONDS of ticks, preallocated
+    rewind_buffer = RewindBuffer(snapshot_record(len(seeds_past), len(trees)), REWIND_SECONDS * SIM_HZ)
+
+    current_time = level["timeline"]
+    victory = False
+    sim_tick = 0
+    sim_time = 0
+
+    # systems that only run when what they depend on changes
+    triggers = Triggers(WORLD_WIDTH, WORLD_HEIGHT)
+    triggers.subscribe(TIMELINE_CHANGED, on_timeline_changed)
+    triggers.subscribe(TREE_CHOPPED, on_tree_chopped)
+    triggers.subscribe(ITEM_PICKED, refresh_hud)
+    triggers.subscribe(SEED_PLACED, refresh_hud)
+    triggers.subscribe(REGION_ENTERED, on_region_entered)
+    triggers.add_region("star", star.rect)
+    trees_stale = True  # the trees were all added above, whatever the timeline
+    refresh_hud()
+
+
+# -------------------------
+# Input
+# -------------------------
+class HeldKeys:
+    """Stand-in for pygame.key.get_pressed() built from a set of held key codes."""
+
+    def __init__(self, keys=()):
+        self.keys = set(keys)
+
+    def __getitem__(self, key):
+        return key in self.keys
+
+
+# KEYDOWN handling (Q/E should be handled here so they trigger once per press)
+def handle_keydown(key):
+    global current_time
+    if key == pygame.K_s and not player.dead:
+        # swap timeline first, then check if swap killed player
+        current_time = "past" if current_time == "present" else "present"
+        if teleport_sound:
+            teleport_sound.play()
+        if swap_maps[current_time].blocked(player.rect):
+            player.dead = True
+            log_event("player.died", "swapped into a block", cause="swap")
+        triggers.emit(TIMELINE_CHANGED, timeline=current_time)
+    elif key == pygame.K_r and player.dead:
+        log_event("input.respawn", "player requested respawn")
+        player.respawn()
+        # reset seeds and remove any trees
+        for s in seeds_past:
+            s.reset()
+        inventory.clear()
+        log_event("inventory.cleared", "inventory cleared, seeds reset", DEBUG)
+        refresh_hud()
+        triggers.forget_regions()
+        if current_time != "present":
+            current_time = "present"
+            triggers.emit(TIMELINE_CHANGED, timeline=current_time)
+    elif key == pygame.K_q:
+        if not axe.picked_up and player.rect.colliderect(axe.rect) and current_time == "present":
+            axe.picked_up = True
+            log_event("axe.picked", "picked up axe")
+            triggers.emit(ITEM_PICKED, item="axe", obj=axe)
+
+        # pick up seed only in past
+        if current_time != "past":
+            log_event("input.ignored", "Q pressed but not in past - cannot pick seed here", DEBUG, key="Q")
+        else:
+            picked_any = False
+            for s in seeds_past:
+                if not s.picked_up and not s.placed and player.rect.colliderect(s.rect):
+                    s.picked_up = True
+                    inventory.append(s)
+                    picked_any = True
+                    log_event("seed.picked", "picked up seed", seed=s.rect.topleft)
+                    triggers.emit(ITEM_PICKED, item="seed", obj=s)
+                    break
+            if not picked_any:
+                log_event("input.ignored", "Q pressed but no pickable seed under player", DEBUG, key="Q")
+    elif key == pygame.K_e:
+        # place the first seed in inventory
+        if axe.picked_up and current_time == "past":
+            for t in trees:
+                if t.alive and player.rect.colliderect(t.trunk.rect.inflate(50, 0)):
+                    log_event("tree.chopped", "tree chopped down", tree=t.trunk.rect.midbottom)
+                    triggers.emit(TREE_CHOPPED, tree=t)
+
+        if not inventory:
+            log_event("input.ignored", "E pressed but inventory empty", DEBUG, key="E")
+        elif player.on_ground:
+            s = inventory.pop(0)
+            # place at player's feet
+            s.rect.bottom = player.rect.bottom + 1
+            s.rect.x = player.rect.centerx - s.rect.width // 2
+            s.placed = True
+            s.picked_up = False
+            # If placed in past and touching ground, mark for growth
+            if current_time == "past":
+                touching_ground = any(s.rect.colliderect(obj.rect) for obj in past_objects)
+                if touching_ground:
+                    s.grown_in_present = True
+                    log_event("seed.placed", "seed is on ground in the past and will grow in the present", seed=s.rect.topleft, grows=True)
                 else:
-                    picked_any = False
-                    for s in seeds_past:
-                        if not s.picked_up and not s.placed and player.rect.colliderect(s.rect):
-                            s.picked_up = True
-                            inventory.append(s)
-                            picked_any = True
-                            print(f"Picked up seed at {s.rect.topleft}")
-                            break
-                    if not picked_any:
-                        print("Q pressed but no pickable seed under player")
-            elif event.key == pygame.K_e:
-                # place the first seed in inventory
-                if axe.picked_up and current_time == "past":
-                    for t in trees:
-                        if t.alive and player.rect.colliderect(t.trunk.rect.inflate(50, 0)):
-                            print("Tree chopped down!")
-                            if t == specialTree:
-                                present_objects.remove(specialBlock)
-                            t.remove_from_world()
-                            t.kill()
-                
-                if not inventory:
-                    print("E pressed but inventory empty")
-                elif player.on_ground:
-                    s = inventory.pop(0)
-                    # place at player's feet
-                    s.rect.bottom = player.rect.bottom + 1
-                    s.rect.x = player.rect.centerx - s.rect.width // 2
-                    s.placed = True
-                    s.picked_up = False
-                    print(f"Placed seed in '{current_time}' at {s.rect.topleft}")
-                    # If placed in past and touching ground, mark for growth
-                    if current_time == "past":
-                        touching_ground = any(s.rect.colliderect(obj.rect) for obj in past_objects)
-                        if touching_ground:
-                            s.grown_in_present = True
-                            print(" -> Seed is on ground in the past and will grow in the present.")
-                        else:
-                            print(" -> Seed not touching ground; it will NOT grow.")
-                    else:
-                        s.placedInPresent = True
-                        print(" -> Seed placed in present; this does nothing (by design).")
-
-    # active lists based on timeline
-    objects = past_objects if current_time == "past" else present_objects
-    climbables = climbables_past if current_time == "past" else climbables_present
-    lasers = lasers_past if current_time == "past" else lasers_present
+                    log_event("seed.placed", "seed not touching ground; it will NOT grow", seed=s.rect.topleft, grows=False)
+            else:
+                s.placedInPresent = True
+                log_event("seed.placed", "seed placed in present; this does nothing (by design)", seed=s.rect.topleft, grows=False)
+            triggers.emit(SEED_PLACED, seed=s, grows=s.grown_in_present)
+
+
+# -------------------------
+# Simulation tick
+# -------------------------
+SIM_HZ = 60
+SIM_DT_MS = 1000 / SIM_HZ
+MAX_SIM_STEPS_PER_FRAME = 5
+RENDER_FPS = 60  # render cap only; game speed is fixed by SIM_HZ
+BAKE_STATIC_LAYERS = True  # False = draw every block/climbable each frame
+DIRTY_RECTS = True  # while the camera stands still, update only the changed parts of the screen
+SWAP_MAP_CELL = 16  # px per cell of the swap-safety occupancy maps
+REWIND_KEY = pygame.K_BACKSPACE  # hold to scrub back in time
+REWIND_SECONDS = 30
+REWIND_STEPS_PER_TICK = 2  # snapshots undone per tick while rewinding (2x speed)
+rewinding = False
+sim_tick = 0
+sim_time = 0  # ms of simulated time, drives the lasers
+held_keys = HeldKeys()  # key state for the tick being simulated
+
+trees_stale = True  # tree membership no longer matches the timeline (see update_trees)
+
+def on_timeline_changed(timeline):
+    global trees_stale
+    if timeline == "present":
+        grow_beanstalks()
+    trees_stale = True
+
+def on_tree_chopped(tree):
+    for layer, block in tree.linked_blocks:
+        layer.discard(block)
+    tree.remove_from_world()
+    tree.kill()
+
+def on_region_entered(region):
+    global victory
+    if region.name == "star" and not star.collected:
+        star.collected = True
+        victory = True
 
+def grow_beanstalks():
     # If a seed is flagged grown_in_present and we are in the present and its tree isn't created, create it now
     for s in seeds_past:
         if s.grown_in_present and current_time == "present" and s.tree_trunk is None:
-            # create trunk (climbable only) and small top platform (solid)
-            trunk_w, trunk_h = 40, 250
-            trunk_x = s.rect.x + s.rect.width // 2 - trunk_w // 2
-            trunk_y = s.rect.y - trunk_h + 32  # 16 to offset seed height
-            beanstalk_img = pygame.image.load("beanstalk.png").convert_alpha()
-            beanstalk_img = pygame.transform.scale(beanstalk_img, (trunk_w, trunk_h))
-            trunk = Climbable(trunk_x, trunk_y, trunk_w, trunk_h, beanstalk_img)
-            s.tree_trunk = trunk
-
-            climbables_present.append(trunk)     # climbable area only
-            print(f"Tree grown for seed at {s.rect.topleft} => trunk {trunk.rect.topleft}, top top_platform.topleft") # changed debug
+            grow_beanstalk(s)
+
+def beanstalk_rect(s):
+    # where the trunk of seed s stands in the present
+    trunk_w, trunk_h = 40, 250
+    trunk_x = s.rect.x + s.rect.width // 2 - trunk_w // 2
+    trunk_y = s.rect.y - trunk_h + 32  # 16 to offset seed height
+    return pygame.Rect(trunk_x, trunk_y, trunk_w, trunk_h)
+
+def grow_beanstalk(s):
+    # create trunk (climbable only) and small top platform (solid)
+    trunk = Climbable(*beanstalk_rect(s), "beanstalk.png")
+    s.tree_trunk = trunk
 
+    climbables_present.add(trunk)     # climbable area only
+    log_event("beanstalk.grown", "tree grown for seed", seed=s.rect.topleft, trunk=trunk.rect.topleft)
+
+def check_lasers():
     # Update lasers -> check lethal collisions
+    field = laser_fields.get(current_time)
+    if field is not None:
+        if field.any_hit(sim_time, player.rect, current_time):
+            if not player.dead:
+                log_event("player.died", "laser was ON", cause="laser")
+            player.dead = True
+        return
+    lasers = lasers_past if current_time == "past" else lasers_present
     for laser in lasers:
-        if laser.update_and_check_collision(now, player.rect, current_time):
+        if laser.update_and_check_collision(sim_time, player.rect, current_time):
+            if not player.dead:
+                log_event("player.died", "laser was ON", cause="laser")
             player.dead = True
-            print("Player died from laser while it was ON")
-    
-    # Update star collection
-    if not star.collected and player.rect.colliderect(star.rect):
-        star.collected = True
-        victory = True
 
+def check_regions():
+    # only the regions near the player are tested; entering the star's wins (on_region_entered)
+    triggers.update_regions(player.rect)
 
-    # Update player
-    player.update(objects, climbables)
-    camera_x, camera_y = get_camera(player.rect)
+def update_player():
+    objects = past_objects if current_time == "past" else present_objects
+    climbables = climbables_past if current_time == "past" else climbables_present
+    player.update(objects, climbables, held_keys)
+
+def update_trees():
+    # trees only exist in the past; applied at the end of the tick the timeline changed in
+    global trees_stale
+    if not trees_stale:
+        return
+    trees_stale = False
+    for t in trees:
+        if current_time == "past" and t.alive:
+            t.add_to_world()
+        else:
+            t.remove_from_world()
 
-    if current_time == "present":
-        screen.blit(background_present, (0, 0))
-    else:
-        screen.blit(background_past, (0, 0))
+# run in this order every tick; names label the profiler phases
+TICK_SYSTEMS = [
+    ("laser collision", check_lasers),
+    ("regions", check_regions),
+    ("player.update", update_player),
+    ("tree membership", update_trees),
+]
+
+def simulate_tick(keys, pressed=()):
+    """Advance the game by one fixed tick with the given input.
+
+    keys is anything indexable by pygame key codes (pygame.key.get_pressed()
+    or HeldKeys); pressed lists the keys that went down since the previous
+    tick and is handled first. Each system is timed by the profiler.
+    """
+    global sim_tick, sim_time, held_keys, rewinding
+    rewinding = bool(keys[REWIND_KEY]) and len(rewind_buffer) > 0
+    if rewinding:
+        with profiler.phase("rewind"):
+            for _ in range(min(REWIND_STEPS_PER_TICK, len(rewind_buffer))):
+                snapshot = rewind_buffer.pop()
+            restore_snapshot(snapshot)
+        return
+    with profiler.phase("rewind"):
+        rewind_buffer.push(*take_snapshot())
+    for key in pressed:
+        handle_keydown(key)
+    sim_tick += 1
+    sim_time = int(sim_tick * SIM_DT_MS)
+    held_keys = keys
+    for name, system in TICK_SYSTEMS:
+        with profiler.phase(name):
+            system()
 
-    screen.blit(darken_overlay, (0, 0))
 
-    # Draw world
-    color = PAST_COLOR if current_time == "past" else PRESENT_COLOR
-    for obj in objects:
-        obj.draw(screen, camera_x, camera_y)
-    
-    # draw star
-    star.draw(screen, camera_x, camera_y)
+# -------------------------
+# Rewind snapshots
+# -------------------------
+# One fixed-size record per tick: sim tick, player x/y/vel_x/vel_y and flags,
+# world flags (timeline, victory, star, axe), then x/y/flags for every seed
+# and an alive flag for every tree. The laser clock is derived from the tick.
+PLAYER_FLAGS = ("on_ground", "dead", "climbing", "facing_right")
+SEED_FLAGS = ("picked_up", "placed", "grown_in_present", "placedInPresent")
+
+def snapshot_record(n_seeds, n_trees):
+    return "<IiiffBB" + "iiB" * n_seeds + "?" * n_trees
+
+def take_snapshot():
+    values = [sim_tick, player.rect.x, player.rect.y, player.vel_x, player.vel_y, pack_flags(player, PLAYER_FLAGS),
+              (current_time == "past") | victory << 1 | star.collected << 2 | axe.picked_up << 3]
+    for s in seeds_past:
+        values += [s.rect.x, s.rect.y, pack_flags(s, SEED_FLAGS) | (s.tree_trunk is not None) << len(SEED_FLAGS)]
+    values += [t.alive for t in trees]
+    return values
+
+def restore_snapshot(values):
+    global sim_tick, sim_time, current_time, victory, trees_stale
+    sim_tick, x, y, player.vel_x, player.vel_y, flags, world_flags = values[:7]
+    sim_time = int(sim_tick * SIM_DT_MS)
+    player.prev_pos = player.rect.topleft  # interpolate from where we were, backwards
+    player.rect.topleft = (x, y)
+    unpack_flags(player, PLAYER_FLAGS, flags)
+    current_time = "past" if world_flags & 1 else "present"
+    victory = bool(world_flags & 2)
+    star.collected = bool(world_flags & 4)
+    axe.picked_up = bool(world_flags & 8)
+
+    pos = 7
+    for s in seeds_past:
+        s.rect.topleft = values[pos:pos + 2]
+        flags = values[pos + 2]
+        unpack_flags(s, SEED_FLAGS, flags)
+        has_trunk = bool(flags >> len(SEED_FLAGS) & 1)
+        if s.tree_trunk is not None and not has_trunk:
+            climbables_present.discard(s.tree_trunk)
+            s.tree_trunk = None
+        elif s.tree_trunk is None and has_trunk:
+            grow_beanstalk(s)
+        pos += 3
+    inventory[:] = [s for s in seeds_past if s.picked_up]
+    refresh_hud()
+    triggers.forget_regions()
+
+    for t, alive in zip(trees, values[pos:]):
+        if alive and not t.alive:
+            t.alive = True
+            for layer, block in t.linked_blocks:
+                layer.add(block)
+        elif t.alive and not alive:
+            t.kill()
+            for layer, block in t.linked_blocks:
+                layer.discard(block)
+    trees_stale = True
+    update_trees()
+
+def pack_flags(obj, names):
+    return sum(bool(getattr(obj, name)) << i for i, name in enumerate(names))
+
+def unpack_flags(obj, names, bits):
+    for i, name in enumerate(names):
+        setattr(obj, name, bool(bits >> i & 1))
 
-    # draw climbables
-    for c in climbables:
-        c.draw(screen, camera_x, camera_y)
 
-    # draw seeds
-    for s in seeds_past:
-        s.draw(screen, camera_x, camera_y, current_time)
+# -------------------------
+# Rendering
+# -------------------------
+def render(surf, alpha=1.0, ui=True):
+    """Draw the current game state; alpha interpolates the player between ticks.
+
+    The world is drawn at surf's size. ui=False leaves out the HUD, for
+    frames the HUD is drawn over later at window size (see draw_ui).
+    """
+    camera_x, camera_y = frame_camera(alpha)
+    world = view.wrap(surf)
+    draw_scene(world, camera_x, camera_y)
+    draw_dynamic(world, camera_x, camera_y, alpha)
+    if ui:
+        draw_ui(surf)
+
+def present(surf, alpha=1.0, ui=True):
+    """Like render(), but redraws only what changed while the scene is the same.
+
+    Returns the rects to pass to pygame.display.update(), or None when the
+    whole frame was redrawn and should be flipped.
+    """
+    camera_x, camera_y = frame_camera(alpha)
+    key = (camera_x, camera_y, current_time, static_layers[current_time].version)
+
+    def scene(target):
+        global scene_culling
+        draw_scene(view.wrap(target), camera_x, camera_y)
+        scene_culling = culler.save()
+
+    def dynamic(target):
+        # the cached scene was counted when it was drawn; count it again on dirty-rect frames
+        culler.restore(scene_culling)
+        draw_dynamic(view.wrap(target), camera_x, camera_y, alpha)
+        if ui:
+            draw_ui(target)
+
+    return presenter.present(surf, key, scene, dynamic)
+
+def frame_camera(alpha):
+    camera = get_camera(player.render_rect(alpha))
+    culler.begin(*camera, WIDTH, HEIGHT)
+    return camera
+
+def draw_scene(surf, camera_x, camera_y):
+    # background and static world: only changes with the camera, timeline or static layers
+    objects = past_objects if current_time == "past" else present_objects
+    climbables = climbables_past if current_time == "past" else climbables_present
 
-    # draw lasers
-    for laser in lasers:
-        laser.draw(screen, camera_x, camera_y, now, current_time)
+    with profiler.phase("background blit"):
+        if current_time == "present":
+            surf.blit(background_present, (0, 0))
+        else:
+            surf.blit(background_past, (0, 0))
 
-    # draw player
-    player.draw(screen, camera_x, camera_y)
+    # Draw world
+    with profiler.phase("world draw"):
+        if BAKE_STATIC_LAYERS:
+            static_layer = static_layers[current_time]
+            tiles = static_layer.draw(surf, camera_x, camera_y)
+            culler.count("tile", tiles, static_layer.cols * static_layer.rows - tiles)
+        else:
+            for obj in culler.query("Block", objects):
+                obj.draw(surf, camera_x, camera_y)
 
-    # draw axe
-    axe.draw(screen, camera_x, camera_y, current_time)
+            # draw climbables
+            for c in culler.query("Climbable", climbables):
+                c.draw(surf, camera_x, camera_y)
 
-    # draw trees
-    if current_time == "past":
-        for t in trees:
-            if t.alive:
-                t.add_to_world()
-                t.draw(screen, camera_x, camera_y, current_time)
-            else:
-                t.remove_from_world()
-    else:
-        for t in trees:
-            t.remove_from_world()
+def draw_dynamic(surf, camera_x, camera_y, alpha):
+    # everything that can change while the camera stands still
+    now = sim_time
+    lasers = lasers_past if current_time == "past" else lasers_present
+    sprites = SpriteBatch(sprite_atlas)  # small sprites, flushed once per layer
 
-    # draw HUD
-    draw_hud(screen, [] + (["seed"] if any(s.picked_up for s in seeds_past) else []) + (["axe"] if axe.picked_up else []))
+    with profiler.phase("world draw"):
+        # draw star
+        if culler.visible("Star", star.rect):
+            star.draw(sprites, camera_x, camera_y)
 
-    # HUD / debug
-    if player.dead:
-        font = pygame.font.SysFont(None, 36)
-        text = font.render("You Died! Press R to Respawn", True, (255, 0, 0))
-        screen.blit(text, (200, 200))
+        # draw seeds (the mound marker sits 10px lower)
+        for s in culler.filter("Seed", seeds_past, lambda s: s.rect.inflate(0, 20)):
+            s.draw(sprites, camera_x, camera_y, current_time)
+        sprites.flush(surf)
 
-    # small debug prints on-screen for inventory/seed state
-    dbg_font = pygame.font.SysFont(None, 20)
-    screen.blit(dbg_font.render(f"Current coordinates: : {player.rect.x}, {player.rect.y}", True, (220,220,220)), (10, 70))
-    screen.blit(dbg_font.render(f"Current timeline: {current_time}", True, (220,220,220)), (10, 90))
+    # draw lasers
+    with profiler.phase("lasers"):
+        draw_lasers(surf, culler.filter("Laser", lasers), camera_x, camera_y, now, current_time)
+
+    with profiler.phase("player + items"):
+        # draw player
+        player.draw(sprites, camera_x, camera_y, alpha)
+
+        # draw axe
+        if culler.visible("Axe", axe.rect):
+            axe.draw(sprites, camera_x, camera_y, current_time)
+        sprites.flush(surf)
+
+    # draw trees
+    with profiler.phase("trees"):
+        if current_time == "past":
+            for t in culler.filter("Tree", trees):
+                if t.alive:
+                    t.draw(surf, camera_x, camera_y, current_time)
+
+def draw_ui(surf):
+    # HUD, debug overlay and victory screen, drawn at surf's (the window's) own size
+    width, height = surf.get_size()
+    with profiler.phase("HUD"):
+        counts = world_counts()
+
+        # draw HUD
+        draw_hud(surf, hud_items)
+        if not player.dead:
+            draw_swap_indicator(surf, swap_maps["past" if current_time == "present" else "present"].blocked(player.rect))
+
+        # HUD / debug
+        if rewinding:
+            text = text_cache.render(fonts.get(None, 36, system=True), "<< Rewinding", (120, 200, 255))
+            surf.blit(text, (width - text.get_width() - 20, 20))
+        elif player.dead:
+            text = text_cache.render(fonts.get(None, 36, system=True), "You Died! Press R to Respawn", (255, 0, 0))
+            surf.blit(text, (200, 200))
+            if rewind_buffer:
+                text = text_cache.render(fonts.get(None, 24, system=True), "or hold Backspace to rewind", (255, 0, 0))
+                surf.blit(text, (200, 235))
+
+        # small debug prints on-screen for inventory/seed state
+        asset_stats = assets.stats()
+        debug_overlay.set("coords", f"Current coordinates: : {player.rect.x}, {player.rect.y}", (10, 70))
+        debug_overlay.set("timeline", f"Current timeline: {current_time}", (10, 90))
+        debug_overlay.set("assets", f"Assets: {asset_stats['misses']} misses, {asset_stats['disk_loads']} disk loads, {asset_stats['baked_loads']} baked", (10, 110))
+        debug_overlay.set("entities", f"Entities: past {counts['past_objects']}+{counts['climbables_past']}, present {counts['present_objects']}+{counts['climbables_present']}", (10, 130))
+        drawn, culled = culler.totals()
+        debug_overlay.set("culling", f"Culling: {drawn} drawn, {culled} culled", (10, 150))
+        debug_overlay.set("rewind", f"Rewind: {len(rewind_buffer) / SIM_HZ:.1f} s buffered ({rewind_buffer.nbytes // 1024} KB)", (10, 170))
+        debug_overlay.set("present", f"Frames: {presenter.full_frames} full, {presenter.partial_frames} dirty-rect", (10, 190))
+        debug_overlay.draw(surf)
 
     if victory:
     # Fill background
-        screen.fill((0, 0, 0))
+        surf.fill((0, 0, 0))
 
         # Large gold text
-        font = pygame.font.Font(None, 72)  # use default font (safer than SysFont)
-        text = font.render("VICTORY!", True, (255, 215, 0))
-        text_rect = text.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 50))
-        screen.blit(text, text_rect)
+        font = fonts.get(None, 72)  # use default font (safer than SysFont)
+        text = text_cache.render(font, "VICTORY!", (255, 215, 0))
+        text_rect = text.get_rect(center=(width // 2, height // 2 - 50))
+        surf.blit(text, text_rect)
 
         # Subtext in white
-        sub_font = pygame.font.Font(None, 36)
-        sub_text = sub_font.render("Press ESC to quit", True, (255, 255, 255))
-        sub_rect = sub_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 30))
-        screen.blit(sub_text, sub_rect)
+        sub_font = fonts.get(None, 36)
+        sub_text = text_cache.render(sub_font, "Press ESC to quit", (255, 255, 255))
+        sub_rect = sub_text.get_rect(center=(width // 2, height // 2 + 30))
+        surf.blit(sub_text, sub_rect)
 
-    pygame.display.flip()  # make sure it shows
-    clock.tick(60)
 
-pygame.quit()
-sys.exit()
+# -------------------------
+# Setup + game loop
+# -------------------------
+def init(headless=False, level_path=LEVEL_PATH, resolution=None, window=None):
+    """Create the display and a fresh game.
+
+    headless uses SDL's dummy video/audio drivers so the game can be stepped
+    without a window or sound card (benchmarks, CI). level_path is the level
+    this and every later new_game() plays. resolution (w, h) is the size
+    the world is drawn at; it always shows WIDTH x HEIGHT world pixels.
+    window (w, h), if different, is the window size the world is scaled up
+    to before the HUD is drawn over it (default: the resolution).
+    """
+    global screen, frame, clock, level
+    resolution = resolution or (WIDTH, HEIGHT)
+    if headless:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+    pygame.init()
+    if not headless:
+        pygame.mixer.init()
+    screen = pygame.display.set_mode(window or resolution)
+    frame = screen if screen.get_size() == tuple(resolution) else pygame.Surface(resolution).convert()
+    pygame.display.set_caption("Clocked In")
+    clock = pygame.time.Clock()
+    level = load_level(level_path)
+    assets.load_baked()  # whatever is stale or missing is decoded from the PNGs below
+    if headless:
+        assets.preload(image_specs(level))
+    else:
+        draw_loading_screen(0, 1)
+        assets.preload(image_specs(level), progress=draw_loading_screen)
+    load_media(sound=not headless)
+    new_game()
+
+
+def upscale_frame():
+    # one scale to the window per frame, when drawing at a lower resolution than the window;
+    # the HUD is then drawn over it at window size
+    if frame is screen:
+        return False
+    pygame.transform.scale(frame, screen.get_size(), screen)
+    draw_ui(screen)
+    return True
+
+def size_arg(text):
+    width, _, height = text.lower().partition("x")
+    return int(width), int(height)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Clocked In")
+    parser.add_argument("--record", metavar="FILE", help="record every tick's input to FILE (see replay.py)")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="profile every frame and save a Chrome trace (.json) or per-frame CSV (.csv) on exit")
+    parser.add_argument("--level", metavar="FILE", default=LEVEL_PATH, help="level to play (default: %(default)s)")
+    parser.add_argument("--log", metavar="FILE", help="append gameplay events to FILE as JSON lines (- for readable lines on stderr)")
+    parser.add_argument("--log-level", choices=LEVELS, default="info", help="least important events logged (default: %(default)s)")
+    parser.add_argument("--resolution", metavar="WxH", type=size_arg, default=(WIDTH, HEIGHT),
+                        help="internal resolution the world is drawn at; the view stays WIDTH x HEIGHT world pixels (default: %(default)s)")
+    parser.add_argument("--window", metavar="WxH", type=size_arg,
+                        help="window size; frames are scaled up to it (default: the resolution)")
+    args = parser.parse_args(argv)
+
+    events.level = LEVELS[args.log_level]
+    if args.log:
+        events.open(args.log)
+
+    init(level_path=args.level, resolution=args.resolution, window=args.window)
+    recorder = None
+    if args.record:
+        from replay import Recorder
+        recorder = Recorder(SIM_HZ, args.level)
+    profiler.tracing = bool(args.profile)
+    profiler.enabled = profiler.tracing
+    show_profiler = False
+    profiler_font = fonts.get(None, 18)
+    pygame.mixer.music.load("ClockedIn-Theme.mp3")
+    pygame.mixer.music.set_volume(0.7)
+    pygame.mixer.music.play(-1)
+
+    running = True
+    accumulator = 0.0
+    pressed = []  # KEYDOWNs waiting for the next tick
+    while running:
+        frame_ms = clock.tick(RENDER_FPS)
+        profiler.begin_frame()
+
+        with profiler.phase("events"):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    show_profiler = not show_profiler
+                    profiler.enabled = show_profiler or profiler.tracing
+                elif event.type == pygame.KEYDOWN:
+                    pressed.append(event.key)
+
+        # run the simulation in fixed ticks, however long the last frame took
+        accumulator += frame_ms
+        steps = 0
+        keys = pygame.key.get_pressed()
+        while accumulator >= SIM_DT_MS and steps < MAX_SIM_STEPS_PER_FRAME:
+            if recorder:
+                recorder.record(keys, pressed)
+            simulate_tick(keys, pressed)
+            pressed = []
+            accumulator -= SIM_DT_MS
+            steps += 1
+        if steps == MAX_SIM_STEPS_PER_FRAME:
+            # too far behind: drop the backlog instead of spiralling
+            accumulator = min(accumulator, SIM_DT_MS)
+
+        if DIRTY_RECTS and not show_profiler:
+            dirty = present(frame, accumulator / SIM_DT_MS, ui=frame is screen)
+        else:
+            render(frame, accumulator / SIM_DT_MS, ui=frame is screen)
+            presenter.invalidate()
+            dirty = None
+        with profiler.phase("upscale"):
+            if upscale_frame():
+                dirty = None
+        if show_profiler:
+            profiler.draw(screen, profiler_font)
+        with profiler.phase("display.flip"):
+            if dirty is None:
+                pygame.display.flip()  # make sure it shows
+            else:
+                pygame.display.update(dirty)
+        profiler.end_frame()
+
+    if args.profile:
+        profiler.save(args.profile)
+        print(f"Saved {len(profiler.frame_rows)} profiled frames to {args.profile}")
+    if recorder:
+        recorder.save(args.record)
+        print(f"Recorded {recorder.ticks} ticks to {args.record}")
+    log_event("session.stats", "game closed", assets=assets.stats(), entities=world_counts(), events=dict(events.counts))
+    events.close()
+    pygame.quit()
+    sys.exit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import math
+
+import numpy as np
+
+
+# -------------------------
+# Vectorized laser schedules
+# -------------------------
+OFF, WARNING, ON = 0, 1, 2
+
+
+class LaserField:
+    """All lasers of a timeline stored as NumPy arrays.
+
+    Evaluates every laser's off/warning/on phase for a given time in one
+    vectorized pass, tests them against a rect, and answers "when is this
+    rect next safe?" from the schedules directly instead of by stepping
+    time. Rects and schedules are copied at construction; rebuild the field
+    if the lasers change.
+    """
+
+    def __init__(self, lasers):
+        self.lasers = list(lasers)
+        self.timelines = sorted({t for laser in self.lasers for t in laser.active_in_timelines})
+        rects = [laser.rect for laser in self.lasers]
+        self.left = np.array([r.left for r in rects], dtype=np.int64)
+        self.top = np.array([r.top for r in rects], dtype=np.int64)
+        self.right = np.array([r.right for r in rects], dtype=np.int64)
+        self.bottom = np.array([r.bottom for r in rects], dtype=np.int64)
+        self.off = np.array([laser.off_duration for laser in self.lasers], dtype=np.int64)
+        self.warning = np.array([laser.warning_duration for laser in self.lasers], dtype=np.int64)
+        self.cycle = np.array([laser.cycle_length for laser in self.lasers], dtype=np.int64)
+        self.start = np.array([laser.start_time for laser in self.lasers], dtype=np.int64)
+        self.on_start = self.off + self.warning  # on is the last phase of each cycle
+        self.active = {
+            timeline: np.array([timeline in laser.active_in_timelines for laser in self.lasers], dtype=bool)
+            for timeline in self.timelines
+        }
+
+    def __len__(self):
+        return len(self.lasers)
+
+    def _phase_time(self, now_ms):
+        return np.mod(now_ms - self.start, self.cycle)
+
+    def states(self, now_ms):
+        """(state codes OFF/WARNING/ON, ms into the current state) for every laser."""
+        t = self._phase_time(now_ms)
+        states = np.where(t >= self.on_start, ON, np.where(t >= self.off, WARNING, OFF))
+        into = t - np.where(states == ON, self.on_start, np.where(states == WARNING, self.off, 0))
+        return states, into
+
+    def overlapping(self, rect, timeline):
+        """Mask of lasers active in timeline whose rect overlaps rect."""
+        active = self.active.get(timeline)
+        if active is None:
+            return np.zeros(len(self.lasers), dtype=bool)
+        return (active & (self.left < rect.right) & (self.right > rect.left)
+                & (self.top < rect.bottom) & (self.bottom > rect.top))
+
+    def hits(self, now_ms, rect, timeline):
+        """Mask of lasers that are on and overlap rect."""
+        mask = self.overlapping(rect, timeline)
+        return mask & (self._phase_time(now_ms) >= self.on_start)
+
+    def any_hit(self, now_ms, rect, timeline):
+        return bool(self.hits(now_ms, rect, timeline).any())
+
+    def next_safe(self, rect, now_ms, timeline):
+        """Earliest time >= now_ms at which no laser overlapping rect is on.
+
+        Jumps straight to the end of the on-phases that cover the candidate
+        time until none do. The combined schedule repeats every hyperperiod
+        (the lcm of the cycles), so if one hyperperiod from now_ms is covered
+        the overlapping lasers never leave a gap and None is returned.
+        """
+        mask = self.overlapping(rect, timeline)
+        if not mask.any():
+            return now_ms
+        start, cycle, on_start = self.start[mask], self.cycle[mask], self.on_start[mask]
+        end = now_ms + math.lcm(*(int(c) for c in np.unique(cycle)))
+        when = now_ms
+        while when < end:
+            t = np.mod(when - start, cycle)
+            on = t >= on_start
+            if not on.any():
+                return int(when)
+            when = int((when + (cycle - t))[on].max())
+        return None
@@ -0,0 +1,138 @@
+"""Level files.
+
+A level is a JSON file (see levels/level1.json) describing the world size,
+player spawn and starting timeline, the blocks and climbables of each
+timeline, lasers, items (seeds, axe, trees, star) and cross-timeline links
+("chopping this tree in the past removes that block in the present").
+Entities that are linked to carry an "id".
+
+compile_level() validates a level, fills in defaults and resolves ids into
+plain tuples; game.new_game() turns those into runtime objects. The
+compiled form is pickled under baked/ next to the source's content hash, so
+later starts skip parsing and validation until the JSON changes.
+"""
+import hashlib
+import json
+import os
+import pickle
+
+from assets import BAKED_DIR
+
+COMPILED_VERSION = 1
+TIMELINES = ("past", "present")
+TREE_DEFAULTS = {"height": 120, "width": 50, "trunk": "treeTrunk.png", "top": "treeTop.png"}
+
+
+def level_digest(path):
+    """SHA-1 of a level file's contents, as the compiled cache and recordings key it."""
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).digest()
+
+
+def load_level(path, cache_dir=BAKED_DIR):
+    """Compiled level for path, from the cache when it is up to date."""
+    with open(path, "rb") as f:
+        source = f.read()
+    digest = hashlib.sha1(source).hexdigest()
+    cache_path = os.path.join(cache_dir, os.path.splitext(os.path.basename(path))[0] + ".level")
+    try:
+        with open(cache_path, "rb") as f:
+            version, cached_digest, level = pickle.load(f)
+        if version == COMPILED_VERSION and cached_digest == digest:
+            return level
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+        pass
+    level = compile_level(json.loads(source), path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_path, "wb") as f:
+            pickle.dump((COMPILED_VERSION, digest, level), f, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        pass  # read-only install: compile on every start
+    return level
+
+
+def compile_level(data, name="level"):
+    """Validate level data and flatten it into tuples.
+
+    Returns a dict with world (w, h), spawn (x, y), timeline, blocks and
+    climbables ({timeline: [(rect, image)]}), lasers ([(rect, axis, off,
+    warning, on, timelines, offset)]), seeds ([(x, y)]), axe and star
+    ((x, y)), trees ([(x, y, height, width, trunk, top)]) and links
+    ([(tree index, (timeline, block index))]).
+    """
+    ids = {}
+
+    def where(*parts):
+        return f"{name}: " + "".join(f"[{p!r}]" if isinstance(p, str) else f"[{p}]" for p in parts)
+
+    def field(obj, key, *parts):
+        if key not in obj:
+            raise ValueError(f"{where(*parts)}: missing {key!r}")
+        return obj[key]
+
+    def ints(value, count, *parts):
+        if not (isinstance(value, list) and len(value) == count and all(isinstance(v, int) for v in value)):
+            raise ValueError(f"{where(*parts)}: expected {count} integers, got {value!r}")
+        return tuple(value)
+
+    def register(obj, ref, *parts):
+        if "id" in obj:
+            if obj["id"] in ids:
+                raise ValueError(f"{where(*parts)}: duplicate id {obj['id']!r}")
+            ids[obj["id"]] = ref
+
+    level = {
+        "world": ints(field(data, "world"), 2, "world"),
+        "spawn": ints(field(data, "spawn"), 2, "spawn"),
+        "timeline": data.get("timeline", "present"),
+    }
+    if level["timeline"] not in TIMELINES:
+        raise ValueError(f"{where('timeline')}: unknown timeline {level['timeline']!r}")
+
+    for kind in ("blocks", "climbables"):
+        layers = data.get(kind, {})
+        unknown = set(layers) - set(TIMELINES)
+        if unknown:
+            raise ValueError(f"{where(kind)}: unknown timeline {sorted(unknown)[0]!r}")
+        level[kind] = {}
+        for timeline in TIMELINES:
+            entries = []
+            for i, obj in enumerate(layers.get(timeline, [])):
+                register(obj, (kind, timeline, i), kind, timeline, i)
+                entries.append((ints(field(obj, "rect", kind, timeline, i), 4, kind, timeline, i, "rect"), obj.get("image")))
+            level[kind][timeline] = entries
+
+    level["lasers"] = []
+    for i, obj in enumerate(data.get("lasers", [])):
+        timelines = tuple(obj.get("timelines", TIMELINES))
+        if not set(timelines) <= set(TIMELINES):
+            raise ValueError(f"{where('lasers', i, 'timelines')}: unknown timeline in {list(timelines)!r}")
+        if obj.get("axis", "h") not in ("h", "v"):
+            raise ValueError(f"{where('lasers', i, 'axis')}: expected 'h' or 'v'")
+        level["lasers"].append((
+            ints(field(obj, "rect", "lasers", i), 4, "lasers", i, "rect"), obj.get("axis", "h"),
+            obj.get("off", 2000), obj.get("warning", 1000), obj.get("on", 3000), timelines, obj.get("offset", 0),
+        ))
+
+    level["seeds"] = [ints(pos, 2, "seeds", i) for i, pos in enumerate(data.get("seeds", []))]
+    level["axe"] = ints(field(data, "axe"), 2, "axe")
+    level["star"] = ints(field(data, "star"), 2, "star")
+
+    level["trees"] = []
+    for i, obj in enumerate(data.get("trees", [])):
+        register(obj, ("trees", i), "trees", i)
+        tree = dict(TREE_DEFAULTS, **{k: v for k, v in obj.items() if k in TREE_DEFAULTS})
+        x, y = ints(field(obj, "pos", "trees", i), 2, "trees", i, "pos")
+        level["trees"].append((x, y, tree["height"], tree["width"], tree["trunk"], tree["top"]))
+
+    level["links"] = []
+    for i, obj in enumerate(data.get("links", [])):
+        tree = ids.get(field(obj, "chop", "links", i))
+        block = ids.get(field(obj, "removes", "links", i))
+        if tree is None or tree[0] != "trees":
+            raise ValueError(f"{where('links', i, 'chop')}: no tree with id {obj['chop']!r}")
+        if block is None or block[0] != "blocks":
+            raise ValueError(f"{where('links', i, 'removes')}: no block with id {obj['removes']!r}")
+        level["links"].append((tree[1], block[1:]))
+    return level
@@ -0,0 +1,81 @@
+import pygame
+
+
+# -------------------------
+# Occupancy map
+# -------------------------
+class OccupancyMap:
+    """Which cells of the world are taken by one WorldLayer's entities.
+
+    The world is cut into square cells. For every cell the map counts the
+    entities that touch it and the entities that cover it completely; the
+    counts follow the layer through its listeners, so adding or discarding
+    an entity only updates the cells under its rect.
+
+    blocked(rect) gives the same answer as testing rect against every entity
+    of the layer: a rect on a fully covered cell is blocked and a rect on
+    untouched cells is free, both without looking at any entity. Only a
+    rect that touches partially covered cells (and nothing fully covered)
+    falls back to an exact test of the entities near it.
+
+    The counts are built on the first blocked() call, so maps that are never
+    queried cost nothing.
+    """
+
+    def __init__(self, world_width, world_height, layer, cell_size=16):
+        self.cell_size = cell_size
+        self.cols = -(-world_width // cell_size)
+        self.rows = -(-world_height // cell_size)
+        self.bounds = pygame.Rect(0, 0, world_width, world_height)
+        self.layer = layer
+        self.touched = None
+        self.covered = None
+        self.exact_checks = 0
+        layer.listeners.append(self._changed)
+
+    def _build(self):
+        self.touched = [0] * (self.cols * self.rows)
+        self.covered = [0] * (self.cols * self.rows)
+        for obj in self.layer:
+            self._mark(obj.rect, 1)
+
+    def _changed(self, obj):
+        if self.touched is not None:
+            self._mark(obj.rect, 1 if obj in self.layer else -1)
+
+    def _mark(self, rect, delta):
+        cs = self.cell_size
+        # cells the rect overlaps at all
+        self._add(self.touched, rect.left // cs, (rect.right - 1) // cs + 1,
+                  rect.top // cs, (rect.bottom - 1) // cs + 1, delta)
+        # cells entirely inside the rect
+        self._add(self.covered, -(-rect.left // cs), rect.right // cs,
+                  -(-rect.top // cs), rect.bottom // cs, delta)
+
+    def _add(self, counts, col0, col1, row0, row1, delta):
+        col0, col1 = max(0, col0), min(self.cols, col1)
+        if col0 >= col1:
+            return
+        for row in range(max(0, row0), min(self.rows, row1)):
+            start, end = row * self.cols + col0, row * self.cols + col1
+            counts[start:end] = [count + delta for count in counts[start:end]]
+
+    def blocked(self, rect):
+        """True if rect overlaps any entity of the layer."""
+        if rect.w <= 0 or rect.h <= 0:
+            return False
+        if self.touched is None:
+            self._build()
+        if self.bounds.contains(rect):
+            cs, cols = self.cell_size, self.cols
+            col0, col1 = rect.left // cs, (rect.right - 1) // cs + 1
+            touched = False
+            for row in range(rect.top // cs, (rect.bottom - 1) // cs + 1):
+                start, end = row * cols + col0, row * cols + col1
+                if any(self.covered[start:end]):
+                    return True
+                touched = touched or any(self.touched[start:end])
+            if not touched:
+                return False
+        self.exact_checks += 1
+        return any(rect.colliderect(obj.rect) for obj in self.layer.query(rect))
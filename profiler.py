@@ -0,0 +1,140 @@
+import csv
+import json
+import time
+from collections import deque
+from contextlib import nullcontext
+
+import pygame
+
+
+# -------------------------
+# Frame profiler
+# -------------------------
+class Profiler:
+    """Times named phases of each frame.
+
+    Wrap work in ``with profiler.phase("name"):``. While disabled, phase()
+    hands back a shared no-op context, so the instrumentation can stay in
+    the hot path. When enabled, every phase adds to ``totals`` (seconds
+    since reset) and to the current frame's breakdown, and frame times are
+    kept for rolling percentiles and the overlay graph. With ``tracing`` on,
+    every phase is also kept as a Chrome trace event (chrome://tracing,
+    Perfetto) and every frame as a CSV row.
+    """
+
+    def __init__(self, history=300):
+        self.enabled = False
+        self.tracing = False
+        self.totals = {}
+        self.frame_phases = {}
+        self.last_frame_phases = {}
+        self.frame_times = deque(maxlen=history)  # ms
+        self.trace_events = []
+        self.frame_rows = []
+        self._frame_start = None
+        self._origin = time.perf_counter()
+        self._null = nullcontext()
+
+    def phase(self, name):
+        if not self.enabled:
+            return self._null
+        return _Phase(self, name)
+
+    def _add(self, name, start, end):
+        elapsed = end - start
+        self.totals[name] = self.totals.get(name, 0.0) + elapsed
+        self.frame_phases[name] = self.frame_phases.get(name, 0.0) + elapsed
+        if self.tracing:
+            self.trace_events.append({
+                "name": name, "ph": "X", "pid": 1, "tid": 1,
+                "ts": (start - self._origin) * 1e6, "dur": elapsed * 1e6,
+            })
+
+    def reset(self):
+        self.totals.clear()
+        self.frame_phases.clear()
+        self.frame_times.clear()
+        self.trace_events.clear()
+        self.frame_rows.clear()
+
+    def begin_frame(self):
+        if self.enabled:
+            self._frame_start = time.perf_counter()
+            self.frame_phases = {}
+
+    def end_frame(self):
+        if not self.enabled or self._frame_start is None:
+            return
+        end = time.perf_counter()
+        frame_ms = (end - self._frame_start) * 1000
+        self.frame_times.append(frame_ms)
+        self.last_frame_phases = self.frame_phases
+        if self.tracing:
+            self.trace_events.append({
+                "name": "frame", "ph": "X", "pid": 1, "tid": 0,
+                "ts": (self._frame_start - self._origin) * 1e6, "dur": frame_ms * 1000,
+            })
+            row = {"frame_ms": frame_ms}
+            row.update({name: secs * 1000 for name, secs in self.frame_phases.items()})
+            self.frame_rows.append(row)
+        self._frame_start = None
+
+    def percentiles(self, pcts=(50, 95, 99)):
+        if not self.frame_times:
+            return tuple(0.0 for _ in pcts)
+        ordered = sorted(self.frame_times)
+        last = len(ordered) - 1
+        return tuple(ordered[min(last, int(round(p / 100 * last)))] for p in pcts)
+
+    def save(self, path):
+        """Write the trace: CSV (one row per frame) for .csv, Chrome trace JSON otherwise."""
+        if path.endswith(".csv"):
+            columns = ["frame_ms"] + sorted({k for row in self.frame_rows for k in row} - {"frame_ms"})
+            with open(path, "w", newline="") as f:
+                writer = csv.DictWriter(f, columns, restval=0)
+                writer.writeheader()
+                writer.writerows(self.frame_rows)
+        else:
+            with open(path, "w") as f:
+                json.dump({"traceEvents": self.trace_events, "displayTimeUnit": "ms"}, f)
+
+    def draw(self, surf, font, budget_ms=1000 / 60):
+        """Frame-time graph plus p50/p95/p99 and the slowest phases of the last frame."""
+        if not self.enabled:
+            return
+        graph_w, graph_h = 240, 60
+        x0 = surf.get_width() - graph_w - 10
+        y0 = 10
+        panel = pygame.Rect(x0 - 5, y0 - 5, graph_w + 10, graph_h + 150)
+        pygame.draw.rect(surf, (0, 0, 0), panel)
+
+        scale = graph_h / (budget_ms * 2)
+        for i, ms in enumerate(list(self.frame_times)[-graph_w:]):
+            h = min(graph_h, int(ms * scale))
+            color = (80, 220, 80) if ms <= budget_ms else (230, 70, 70)
+            pygame.draw.line(surf, color, (x0 + i, y0 + graph_h), (x0 + i, y0 + graph_h - h))
+        budget_y = y0 + graph_h - int(budget_ms * scale)
+        pygame.draw.line(surf, (200, 200, 0), (x0, budget_y), (x0 + graph_w, budget_y))
+
+        p50, p95, p99 = self.percentiles()
+        lines = [f"p50 {p50:.1f}  p95 {p95:.1f}  p99 {p99:.1f} ms"]
+        slowest = sorted(self.last_frame_phases.items(), key=lambda item: -item[1])[:7]
+        lines += [f"{name:<16} {secs * 1000:6.2f} ms" for name, secs in slowest]
+        y = y0 + graph_h + 5
+        for line in lines:
+            surf.blit(font.render(line, True, (230, 230, 230)), (x0, y))
+            y += 18
+
+
+class _Phase:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.profiler._add(self.name, self.start, time.perf_counter())
@@ -0,0 +1,193 @@
+"""Input recording and deterministic replay.
+
+A recording is the per-tick input the simulation consumed: the held keys
+(A, D, W movement, Backspace rewind) and the KEYDOWN actions (S swap,
+R respawn, Q pickup, E place/chop). The held keys pack into one byte; the
+presses follow in the order they happened, repeats included, since a slow
+frame hands all of its KEYDOWNs to one tick. Runs of identical ticks are
+run-length encoded, so a minute of play is typically a few hundred bytes. The
+header names the level file the recording was made on, with a hash of its
+contents; replays run on that level (or --level) and say so when the file has
+changed since.
+
+Record while playing:
+
+    python game.py --record run.clk
+
+Replay in real time in a window, or verify many recordings headlessly at full
+speed (exit status 1 if any of them no longer reaches the star):
+
+    python replay.py run.clk --realtime
+    python replay.py --verify recordings/*.clk
+    python replay.py --verify run.clk --level levels/level1.json
+"""
+import argparse
+import struct
+import sys
+
+import pygame
+
+from level import level_digest
+
+MAGIC = b"CLKR"
+VERSION = 3
+HEADER = struct.Struct("<4sBHI")  # magic, version, sim Hz, tick count
+LEVEL = struct.Struct("<20sH")  # SHA-1 of the level file, length of its UTF-8 path (which follows); since version 2
+RUN = struct.Struct("<BBH")  # held byte, number of presses (their key indices follow, a byte each), ticks it repeats for
+BITS_RUN = struct.Struct("<BH")  # versions 1 and 2: held and pressed bits in one byte, ticks it repeats for
+
+HELD_KEYS = (pygame.K_a, pygame.K_d, pygame.K_w)
+PRESS_KEYS = (pygame.K_s, pygame.K_r, pygame.K_q, pygame.K_e)
+REWIND_KEY = pygame.K_BACKSPACE  # game.REWIND_KEY, held; uses the last bit
+REWIND_BIT = 1 << 7
+
+
+def encode_tick(keys, pressed):
+    """(held byte, press key indices in order) for one tick."""
+    bits = 0
+    for i, key in enumerate(HELD_KEYS):
+        if keys[key]:
+            bits |= 1 << i
+    if keys[REWIND_KEY]:
+        bits |= REWIND_BIT
+    return bits, bytes(PRESS_KEYS.index(key) for key in pressed if key in PRESS_KEYS)
+
+
+def decode_tick(bits, presses=b""):
+    held = {key for i, key in enumerate(HELD_KEYS) if bits & (1 << i)}
+    if bits & REWIND_BIT:
+        held.add(REWIND_KEY)
+    return held, [PRESS_KEYS[i] for i in presses]
+
+
+def decode_bits(bits):
+    # versions 1 and 2 kept one bit per press key: at most one of each, in PRESS_KEYS order
+    presses = bytes(i for i in range(len(PRESS_KEYS)) if bits & (1 << (len(HELD_KEYS) + i)))
+    return decode_tick(bits, presses)
+
+
+# -------------------------
+# Recording
+# -------------------------
+class Recorder:
+    """Collects the input of every simulated tick; save() writes the log."""
+
+    def __init__(self, sim_hz, level_path):
+        self.sim_hz = sim_hz
+        self.level_path = level_path
+        self.level_digest = level_digest(level_path)
+        self.ticks = 0
+        self.runs = []  # [(held byte, press indices), count]
+
+    def record(self, keys, pressed=()):
+        tick = encode_tick(keys, pressed)
+        if self.runs and self.runs[-1][0] == tick and self.runs[-1][1] < 0xFFFF:
+            self.runs[-1][1] += 1
+        else:
+            self.runs.append([tick, 1])
+        self.ticks += 1
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.sim_hz, self.ticks))
+            level_path = self.level_path.encode("utf-8")
+            f.write(LEVEL.pack(self.level_digest, len(level_path)) + level_path)
+            for (bits, presses), count in self.runs:
+                f.write(RUN.pack(bits, len(presses), count) + presses)
+
+
+def load(path):
+    """Return (sim_hz, (level path, level digest), [(held key set, pressed key list) per tick]).
+
+    Version 1 recordings do not name their level; theirs is None.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, sim_hz, ticks = HEADER.unpack_from(data)
+    if magic != MAGIC or version not in (1, 2, VERSION):
+        raise ValueError(f"{path}: not a version 1-{VERSION} recording")
+    offset = HEADER.size
+    level = None
+    if version >= 2:
+        digest, length = LEVEL.unpack_from(data, offset)
+        offset += LEVEL.size
+        level = (data[offset:offset + length].decode("utf-8"), digest)
+        offset += length
+    inputs = []
+    if version < 3:
+        for bits, count in BITS_RUN.iter_unpack(data[offset:]):
+            inputs.extend([decode_bits(bits)] * count)
+    else:
+        while offset < len(data):
+            bits, n_presses, count = RUN.unpack_from(data, offset)
+            offset += RUN.size
+            inputs.extend([decode_tick(bits, data[offset:offset + n_presses])] * count)
+            offset += n_presses
+    if len(inputs) != ticks:
+        raise ValueError(f"{path}: expected {ticks} ticks, found {len(inputs)}")
+    return sim_hz, level, inputs
+
+
+# -------------------------
+# Replay
+# -------------------------
+def replay(path, realtime=False, level_path=None):
+    """Feed a recording through a fresh game. Returns True if the star was reached.
+
+    The game must already be initialised (game.init). It plays on
+    level_path if given, else on the level it was recorded on. With realtime
+    the frames are rendered and paced at the recording's tick rate.
+    """
+    import game  # not at module level: game.py imports this module for --record
+
+    sim_hz, level, inputs = load(path)
+    if sim_hz != game.SIM_HZ:
+        raise ValueError(f"{path}: recorded at {sim_hz} Hz, game runs at {game.SIM_HZ} Hz")
+    if level_path is None:
+        level_path = level[0] if level else game.LEVEL_PATH
+    if level and level_digest(level_path) != level[1]:
+        print(f"{path}: {level_path} has changed since this was recorded", file=sys.stderr)
+    game.new_game(level_path)
+    keys = game.HeldKeys()
+    clock = pygame.time.Clock()
+    for held, pressed in inputs:
+        keys.keys = held
+        game.simulate_tick(keys, pressed)
+        if realtime:
+            pygame.event.pump()
+            game.render(game.frame, ui=game.frame is game.screen)
+            game.upscale_frame()
+            pygame.display.flip()
+            clock.tick(sim_hz)
+        if game.victory:
+            break
+    return game.victory
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recordings", nargs="+")
+    parser.add_argument("--realtime", action="store_true", help="show the replay in a window at normal speed")
+    parser.add_argument("--verify", action="store_true", help="exit 1 if any recording does not reach the star")
+    parser.add_argument("--level", metavar="FILE", help="play on this level instead of the one each recording names")
+    args = parser.parse_args(argv)
+
+    import game
+    level_path = args.level
+    if level_path is None:
+        level = load(args.recordings[0])[1]
+        level_path = level[0] if level else game.LEVEL_PATH
+    game.init(headless=not args.realtime, level_path=level_path)
+    failed = []
+    for path in args.recordings:
+        won = replay(path, realtime=args.realtime, level_path=args.level)
+        print(f"{path}: {'star reached' if won else 'star NOT reached'}")
+        if not won:
+            failed.append(path)
+    if args.verify and failed:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+import struct
+
+
+# -------------------------
+# Rewind buffer
+# -------------------------
+class RewindBuffer:
+    """Ring buffer of fixed-size binary snapshots, newest on top.
+
+    Each snapshot is one struct record packed into a bytearray allocated up
+    front (record.size * capacity bytes), so memory does not depend on how
+    long the game runs. Once full, pushing overwrites the oldest snapshot.
+    pop() unpacks and removes the newest one.
+    """
+
+    def __init__(self, record, capacity):
+        if isinstance(record, str):
+            record = struct.Struct(record)
+        self.record = record
+        self.capacity = capacity
+        self.data = bytearray(record.size * capacity)
+        self._start = 0  # slot of the oldest snapshot
+        self._count = 0
+
+    def push(self, *values):
+        slot = (self._start + self._count) % self.capacity
+        if self._count == self.capacity:
+            self._start = (self._start + 1) % self.capacity
+        else:
+            self._count += 1
+        self.record.pack_into(self.data, slot * self.record.size, *values)
+
+    def pop(self):
+        if not self._count:
+            return None
+        self._count -= 1
+        slot = (self._start + self._count) % self.capacity
+        return self.record.unpack_from(self.data, slot * self.record.size)
+
+    def clear(self):
+        self._start = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def nbytes(self):
+        return len(self.data)
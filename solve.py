@@ -0,0 +1,424 @@
+"""Level solvability checker.
+
+Searches for an input sequence that reaches the star, using the real game
+simulation on SDL's dummy drivers. A search state is a rewind snapshot
+(see game.take_snapshot); an action holds a set of movement keys for
+--step ticks, optionally starting with an S/Q/E press. Q and E are only
+tried where they can do something. States are deduplicated on the
+timeline, the player position rounded to --grid pixels, whether it is
+rising, falling, standing or climbing, every item/tree flag, the seed
+positions rounded like the player's and, near a laser, the laser phase
+rounded to one step. That is an approximation: two states in the same
+bucket are treated as one, so a finer grid finds routes a coarser one can
+miss.
+
+Frontier states are expanded in batches on a process pool (--workers).
+--strategy astar (the default) expands first the states with the fewest
+steps taken plus --weight times the steps still needed, as measured on a
+distance field of the level through the items still in the way (see
+_distance_to_star); with a weight above 1 its route need not be the
+shortest. bfs finds the route with the fewest steps, but only small levels
+finish in reasonable time.
+
+    python solve.py
+    python solve.py levels/level1.json --save solution.clk
+    python replay.py --verify solution.clk
+
+Exit status is 1 if the star cannot be reached and 2 if --max-states ran
+out before the search could tell.
+"""
+import argparse
+import heapq
+import math
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pygame
+
+HELD_SETS = ((), (pygame.K_a,), (pygame.K_d,), (pygame.K_w,), (pygame.K_a, pygame.K_w), (pygame.K_d, pygame.K_w))
+PRESSES = (pygame.K_s, pygame.K_q, pygame.K_e)
+# (held keys, key pressed on the first tick or None)
+ACTIONS = [(held, None) for held in HELD_SETS] + [((), key) for key in PRESSES]
+KEY_NAMES = {pygame.K_a: "A", pygame.K_d: "D", pygame.K_w: "W", pygame.K_s: "S", pygame.K_q: "Q", pygame.K_e: "E"}
+
+
+# -------------------------
+# Worker side (owns a headless game)
+# -------------------------
+_settings = {}
+
+
+def _init_worker(level_path, step, grid):
+    import game
+    game.init(headless=True, level_path=level_path)
+    # how far the player can get from a laser within one step and still care about its phase
+    reach = step * 4 * 2
+    _settings.update(game=game, step=step, grid=grid, laser_period=_laser_period(game),
+                     geometry=_geometry(game), fields={},
+                     laser_zones={"past": [l.rect.inflate(reach, reach) for l in game.lasers_past],
+                                  "present": [l.rect.inflate(reach, reach) for l in game.lasers_present]})
+
+
+def _laser_period(game):
+    cycles = {laser.cycle_length for laser in game.lasers_present + game.lasers_past}
+    period = 1
+    for cycle in cycles:
+        period = period * cycle // math.gcd(period, cycle)
+    return period
+
+
+def _state_key(game):
+    grid, step = _settings["grid"], _settings["step"]
+    player = game.player
+    phase = 0
+    if player.rect.collidelist(_settings["laser_zones"][game.current_time]) != -1:
+        phase = 1 + int(game.sim_time % _settings["laser_period"] // (step * game.SIM_DT_MS))
+    snapshot = game.take_snapshot()
+    # after the player fields: timeline/item flags, then x, y, flags per seed, then the trees
+    seeds = snapshot[7:7 + 3 * len(game.seeds_past)]
+    for i in range(0, len(seeds), 3):
+        seeds[i] //= grid
+        seeds[i + 1] //= grid
+    rising = (player.vel_y > 0) - (player.vel_y < 0)
+    return (player.rect.x // grid, player.rect.y // grid, rising, player.on_ground, player.climbing,
+            phase, snapshot[6]) + tuple(seeds) + tuple(snapshot[7 + len(seeds):])
+
+
+def _useful(game, key):
+    player = game.player
+    if key == pygame.K_q:
+        if game.current_time == "present":
+            return not game.axe.picked_up and player.rect.colliderect(game.axe.rect)
+        return any(not s.picked_up and not s.placed and player.rect.colliderect(s.rect) for s in game.seeds_past)
+    if key == pygame.K_e:
+        if game.inventory and player.on_ground and game.current_time == "past":
+            return True  # a seed only grows when planted in the past
+        return game.axe.picked_up and game.current_time == "past" and any(
+            t.alive and player.rect.colliderect(t.trunk.rect.inflate(50, 0)) for t in game.trees)
+    return True
+
+
+CELL = 16  # px per cell of the distance fields
+JUMP = 90  # px a jump lifts the player off the ground
+TIMELINES = ("past", "present")
+
+
+def _geometry(game):
+    """Solid and climbable rects of each timeline that no tree or seed changes, and what each standing tree adds."""
+    parts = {id(part) for t in game.trees for part in (t.trunk, t.top, t.support)}
+    parts.update(id(block) for t in game.trees for _, block in t.linked_blocks)
+    rects = lambda layer: [obj.rect.copy() for obj in layer if id(obj) not in parts]
+    return {
+        "solid": {"past": rects(game.past_objects), "present": rects(game.present_objects)},
+        "climb": {"past": rects(game.climbables_past), "present": rects(game.climbables_present)},
+        # (solid parts, trunk, [(timeline, linked block)]) per tree
+        "trees": [([part.rect for part in (t.top, t.support) if part], t.trunk.rect,
+                   [("past" if layer is game.past_objects else "present", block.rect) for layer, block in t.linked_blocks])
+                  for t in game.trees],
+        "size": game.player.rect.size,
+        "beanstalk": game.beanstalk_rect(game.Seed(0, 0)).height,
+        "cols": -(-game.WORLD_WIDTH // CELL), "rows": -(-game.WORLD_HEIGHT // CELL),
+    }
+
+
+def _cells(rects, cols, rows, width, height, dy=0):
+    """Cells c whose rect (c.x * CELL, c.y * CELL + dy, width, height) overlaps one of rects, as flat indices."""
+    found = set()
+    for r in rects:
+        for cy in range(max(0, (r.top - dy - height) // CELL + 1), min(rows, -(-(r.bottom - dy) // CELL))):
+            row = cy * cols
+            found.update(range(row + max(0, (r.left - width) // CELL + 1), row + min(cols, -(-r.right // CELL))))
+    return found
+
+
+def _field(targets, alive, trunks, seeds_left):
+    """Fewest ticks from every cell to a cell touching one of targets, and the cells touching them.
+
+    targets are (timelines, rect) pairs. The world is the level with only the
+    trees flagged in alive standing and a beanstalk on each of trunks, and
+    the moves are relaxed: the player walks 4 px/tick, falls 10, climbs 3
+    where a climbable or the ground a jump below holds them up, and swaps
+    timeline in one tick where the other one is free. While seeds_left, it
+    can also climb anywhere above past ground in the present, where a
+    planted seed would grow. Cells are laid out [timeline][row][col].
+    """
+    key = (targets, alive, trunks, seeds_left)
+    cached = _settings["fields"].get(key)
+    if cached:
+        return cached
+    geo = _settings["geometry"]
+    cols, rows, (width, height) = geo["cols"], geo["rows"], geo["size"]
+    solid = {timeline: list(rects) for timeline, rects in geo["solid"].items()}
+    climb = {timeline: list(rects) for timeline, rects in geo["climb"].items()}
+    for (parts, trunk, links), standing in zip(geo["trees"], alive):
+        if standing:
+            solid["past"] += parts
+            climb["past"].append(trunk)
+            for timeline, block in links:
+                solid[timeline].append(block)
+    climb["present"] += [pygame.Rect(trunk) for trunk in trunks]
+
+    size = cols * rows
+    blocked, holds = set(), set()
+    for i, timeline in enumerate(TIMELINES):
+        offset = i * size
+        blocked.update(offset + c for c in _cells(solid[timeline], cols, rows, width, height))
+        hold = _cells(climb[timeline], cols, rows, width, height) | _cells(solid[timeline], cols, rows, width, JUMP, height)
+        if seeds_left and timeline == "present":
+            hold |= _cells(solid["past"], cols, rows, width, geo["beanstalk"], height)
+        holds.update(offset + c for c in hold)
+
+    sources = []
+    for timelines, rect in targets:
+        for timeline in timelines:
+            offset = TIMELINES.index(timeline) * size
+            sources += [offset + c for c in _cells([pygame.Rect(rect)], cols, rows, width, height)
+                        if offset + c not in blocked]
+    ticks = [math.inf] * (2 * size)
+    heap = []
+    for cell in sources:
+        ticks[cell] = 0
+        heap.append((0, cell))
+    # walk the moves backwards: from each cell to the cells that lead into it
+    side, fall, rise = CELL / 4, CELL / 10, CELL / 3
+    while heap:
+        t, cell = heapq.heappop(heap)
+        if t > ticks[cell]:
+            continue
+        col = cell % cols
+        moves = [(cell + size if cell < size else cell - size, 1)]
+        if col > 0:
+            moves.append((cell - 1, side))
+        if col < cols - 1:
+            moves.append((cell + 1, side))
+        if cell % size >= cols:
+            moves.append((cell - cols, fall))
+        if cell % size < size - cols and cell + cols in holds:
+            moves.append((cell + cols, rise))
+        for prev, cost in moves:
+            if prev not in blocked and t + cost < ticks[prev]:
+                ticks[prev] = t + cost
+                heapq.heappush(heap, (t + cost, prev))
+    _settings["fields"][key] = ticks, sources
+    return ticks, sources
+
+
+def _distance_to_star(game):
+    """Steps along the items still in the way: seeds, the axe, the linked trees it has to chop, then the star.
+
+    The route goes through every seed still lying around, then, while a
+    linked tree stands (chopping one opens a way in the other timeline),
+    through the axe (unless held) and each such tree. Each leg is measured
+    on a distance field of the level (see _field), so the way round walls
+    and cliffs counts (lasers do not). Where to plant a seed is left to the
+    search; the field tells it when a beanstalk leads nowhere.
+    """
+    geo = _settings["geometry"]
+    cols, size = geo["cols"], geo["cols"] * geo["rows"]
+    player = game.player
+    offset = TIMELINES.index(game.current_time) * size
+    col, row = player.rect.x // CELL, player.rect.y // CELL
+    # the cell below or right of the player if it stands flush against a wall or ceiling
+    cells = [offset + (row + dr) * cols + col + dc for dr in (0, 1) for dc in (0, 1)]
+
+    alive = [t.alive for t in game.trees]
+    legs = [(((("past",), tuple(s.rect)),), tuple(alive))
+            for s in game.seeds_past if not s.picked_up and not s.placed]
+    linked = [i for i, t in enumerate(game.trees) if t.alive and t.linked_blocks]
+    if linked and not game.axe.picked_up:
+        legs.append((((("present",), tuple(game.axe.rect)),), tuple(alive)))
+    for i in linked:
+        legs.append((((("past",), tuple(game.trees[i].trunk.rect.inflate(50, 0))),), tuple(alive)))
+        alive[i] = False
+    legs.append((((TIMELINES, tuple(game.star.rect)),), tuple(alive)))
+
+    trunks = tuple(tuple(game.beanstalk_rect(s)) for s in game.seeds_past if s.grown_in_present)
+    seeds_left = any(not s.placed for s in game.seeds_past)
+    total = 0
+    for targets, standing in legs:
+        ticks, sources = _field(targets, standing, trunks, seeds_left)
+        total += min((ticks[cell] for cell in cells if 0 <= cell < 2 * size), default=math.inf)
+        cells = sources
+    return total / _settings["step"]
+
+
+def initial_state():
+    game = _settings["game"]
+    game.new_game()
+    return tuple(game.take_snapshot()), _state_key(game), _distance_to_star(game)
+
+
+def expand(batch):
+    """Children of each (state id, snapshot): [(state id, action, snapshot, key, won, h)]."""
+    game, step = _settings["game"], _settings["step"]
+    keys = game.HeldKeys()
+    children = []
+    for state_id, snapshot in batch:
+        for action, (held, press) in enumerate(ACTIONS):
+            game.restore_snapshot(snapshot)
+            if press is not None and not _useful(game, press):
+                continue
+            keys.keys = set(held)
+            for tick in range(step):
+                game.simulate_tick(keys, [press] if tick == 0 and press is not None else ())
+                if game.player.dead or game.victory:
+                    break
+            if game.player.dead:
+                continue
+            children.append((state_id, action, tuple(game.take_snapshot()), _state_key(game),
+                             game.victory, _distance_to_star(game)))
+    return children
+
+
+# -------------------------
+# Search (main process)
+# -------------------------
+def solve(level_path, strategy="astar", workers=None, step=12, grid=8, batch=64, max_states=500000, weight=2.0,
+          progress=None):
+    """Search the level; returns a dict with the route (list of action indices, or None) and stats."""
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    if workers > 1:
+        pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(level_path, step, grid))
+        run = lambda fn, *args: pool.submit(fn, *args)
+        gather = lambda futures: [f.result() for f in futures]
+    else:
+        pool = None
+        _init_worker(level_path, step, grid)
+        run = lambda fn, *args: fn(*args)
+        gather = list
+
+    try:
+        root, root_key, root_h = gather([run(initial_state)])[0]
+        snapshots = [root]
+        parents = [None]  # state id -> (parent id, action)
+        depths = [0]
+        seen = {root_key}
+        if strategy == "bfs":
+            frontier = deque([0])
+            pop = frontier.popleft
+            push = lambda state_id, h: frontier.append(state_id)
+        else:
+            frontier = [(root_h, 0)]
+            pop = lambda: heapq.heappop(frontier)[1]
+            push = lambda state_id, h: heapq.heappush(frontier, (depths[state_id] + weight * h, state_id))
+
+        expanded = 0
+        won = None
+        while frontier and won is None and len(snapshots) < max_states:
+            # bfs expands a whole depth at a time so the first win found is the shortest
+            if strategy == "bfs":
+                depth = depths[frontier[0]]
+                ids = []
+                while frontier and depths[frontier[0]] == depth:
+                    ids.append(pop())
+            else:
+                ids = [pop() for _ in range(min(len(frontier), batch * workers))]
+            chunk = max(1, -(-len(ids) // (workers * 4)))
+            jobs = [run(expand, [(i, snapshots[i]) for i in ids[n:n + chunk]]) for n in range(0, len(ids), chunk)]
+            expanded += len(ids)
+            for children in gather(jobs):
+                for parent, action, snapshot, key, victory, h in children:
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    snapshots.append(snapshot)
+                    parents.append((parent, action))
+                    depths.append(depths[parent] + 1)
+                    if victory and won is None:
+                        won = len(snapshots) - 1
+                    push(len(snapshots) - 1, h)
+            if progress:
+                progress(expanded, len(snapshots), time.perf_counter() - start)
+    finally:
+        if pool:
+            pool.shutdown()
+
+    route = None
+    if won is not None:
+        route = []
+        state_id = won
+        while parents[state_id] is not None:
+            state_id, action = parents[state_id]
+            route.append(action)
+        route.reverse()
+    elapsed = time.perf_counter() - start
+    return {
+        "level": level_path, "strategy": strategy, "workers": workers, "step": step, "grid": grid,
+        "solved": route is not None, "route": route, "states": len(snapshots), "expanded": expanded,
+        "seconds": elapsed, "states_per_second": expanded / elapsed if elapsed else 0.0,
+        "exhausted": won is None and not frontier,
+    }
+
+
+def route_inputs(route, step):
+    """The route as per-tick (held keys, pressed keys), as replay.load() returns them."""
+    ticks = []
+    for action in route:
+        held, press = ACTIONS[action]
+        for tick in range(step):
+            ticks.append((set(held), [press] if tick == 0 and press is not None else []))
+    return ticks
+
+
+def describe(route):
+    parts = []
+    for action in route:
+        held, press = ACTIONS[action]
+        name = KEY_NAMES[press] if press else "+".join(KEY_NAMES[k] for k in held) or "wait"
+        if parts and parts[-1][0] == name:
+            parts[-1][1] += 1
+        else:
+            parts.append([name, 1])
+    return " ".join(name if count == 1 else f"{name}x{count}" for name, count in parts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("level", nargs="?", default=os.path.join("levels", "level1.json"))
+    parser.add_argument("--strategy", choices=("bfs", "astar"), default="astar")
+    parser.add_argument("--workers", type=int, help="processes to expand states on (default: CPU count)")
+    parser.add_argument("--step", type=int, default=12, help="ticks each action lasts (default: %(default)s)")
+    parser.add_argument("--grid", type=int, default=8, help="px the player position is rounded to (default: %(default)s)")
+    parser.add_argument("--weight", type=float, default=2.0,
+                        help="astar: how much more the steps still needed count than the steps taken (default: %(default)s)")
+    parser.add_argument("--max-states", type=int, default=500000, help="give up after this many states (exit status 2)")
+    parser.add_argument("--save", metavar="FILE", help="write the route as a replay recording")
+    parser.add_argument("--quiet", action="store_true", help="no progress lines")
+    args = parser.parse_args(argv)
+
+    def progress(expanded, states, seconds):
+        print(f"  {expanded} expanded, {states} states, {seconds:.1f} s", file=sys.stderr)
+
+    result = solve(args.level, args.strategy, args.workers, args.step, args.grid,
+                   max_states=args.max_states, weight=args.weight, progress=None if args.quiet else progress)
+    rate = f"{result['expanded']} states expanded in {result['seconds']:.1f} s " \
+           f"({result['states_per_second']:.0f}/s, {result['workers']} workers)"
+    if not result["solved"] and result["exhausted"]:
+        print(f"{args.level}: star NOT reachable (search space exhausted); {rate}")
+        return 1
+    if not result["solved"]:
+        print(f"{args.level}: undecided (state budget exhausted after {result['states']} states); {rate}")
+        return 2
+    route = result["route"]
+    ticks = len(route) * args.step
+    print(f"{args.level}: star reached in {len(route)} steps ({ticks} ticks, {ticks / 60:.1f} s); {rate}")
+    print("  " + describe(route))
+    if args.save:
+        from replay import Recorder
+        import game
+        recorder = Recorder(game.SIM_HZ, args.level)
+        keys = game.HeldKeys()
+        for held, pressed in route_inputs(route, args.step):
+            keys.keys = held
+            recorder.record(keys, pressed)
+        recorder.save(args.save)
+        print(f"  saved to {args.save}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+import itertools
+
+
+# -------------------------
+# Spatial grid
+# -------------------------
+class SpatialGrid:
+    """Uniform grid over the world that buckets objects by their rect.
+
+    Every object must have a ``rect``. Queries return the objects whose cells
+    overlap the given rect, in the order they were inserted, so callers that
+    resolve collisions one object at a time behave exactly like a linear scan.
+    """
+
+    def __init__(self, world_width, world_height, cell_size=100):
+        self.cell_size = cell_size
+        self.cols = max(1, -(-world_width // cell_size))
+        self.rows = max(1, -(-world_height // cell_size))
+        self.cells = [{} for _ in range(self.cols * self.rows)]
+        self._cells_of = {}
+        self._order = {}
+        self._counter = itertools.count()
+
+    def _cell_indices(self, rect):
+        cs = self.cell_size
+        x0 = min(max(int(rect.left) // cs, 0), self.cols - 1)
+        x1 = min(max((int(rect.right) - 1) // cs, 0), self.cols - 1)
+        y0 = min(max(int(rect.top) // cs, 0), self.rows - 1)
+        y1 = min(max((int(rect.bottom) - 1) // cs, 0), self.rows - 1)
+        return [row * self.cols + col
+                for row in range(y0, y1 + 1)
+                for col in range(x0, x1 + 1)]
+
+    def insert(self, obj):
+        if obj in self._cells_of:
+            return
+        indices = self._cell_indices(obj.rect)
+        for i in indices:
+            self.cells[i][obj] = None
+        self._cells_of[obj] = indices
+        self._order[obj] = next(self._counter)
+
+    def remove(self, obj):
+        indices = self._cells_of.pop(obj, None)
+        if indices is None:
+            return
+        for i in indices:
+            del self.cells[i][obj]
+        del self._order[obj]
+
+    def move(self, obj):
+        """Re-bucket obj after its rect changed, keeping its query order."""
+        indices = self._cells_of.get(obj)
+        if indices is None:
+            return
+        for i in indices:
+            del self.cells[i][obj]
+        indices = self._cell_indices(obj.rect)
+        for i in indices:
+            self.cells[i][obj] = None
+        self._cells_of[obj] = indices
+
+    def query(self, rect):
+        indices = self._cell_indices(rect)
+        if len(indices) == 1:
+            return sorted(self.cells[indices[0]], key=self._order.__getitem__)
+        found = {}
+        for i in indices:
+            found.update(self.cells[i])
+        return sorted(found, key=self._order.__getitem__)
+
+    def __contains__(self, obj):
+        return obj in self._cells_of
+
+    def __len__(self):
+        return len(self._cells_of)
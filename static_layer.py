@@ -0,0 +1,68 @@
+import pygame
+
+
+# -------------------------
+# Static layer compositor
+# -------------------------
+class StaticLayer:
+    """Pre-rendered picture of one timeline's static geometry.
+
+    The world is split into square tiles. Each tile is baked once by drawing
+    every entity of the given WorldLayers (in order) that overlaps it, and
+    drawing the layer is then one blit per visible tile. The StaticLayer
+    listens to its WorldLayers, so when an entity is added or discarded
+    (chopped tree, removed specialBlock, grown beanstalk) only the tiles
+    under its rect are rebaked, the next time they are on screen. ``version``
+    goes up on every invalidation, for callers caching what draw() produced.
+    """
+
+    def __init__(self, world_width, world_height, layers, tile_size=400):
+        self.tile_size = tile_size
+        self.cols = -(-world_width // tile_size)
+        self.rows = -(-world_height // tile_size)
+        self.layers = layers
+        self.tiles = {}
+        self.dirty = {(col, row) for col in range(self.cols) for row in range(self.rows)}
+        self.bakes = 0
+        self.version = 0
+        for layer in layers:
+            layer.listeners.append(self.invalidate_entity)
+
+    def invalidate_entity(self, obj):
+        self.invalidate(obj.rect)
+
+    def invalidate(self, rect):
+        ts = self.tile_size
+        self.version += 1
+        for row in range(max(0, int(rect.top) // ts), min(self.rows, (int(rect.bottom) - 1) // ts + 1)):
+            for col in range(max(0, int(rect.left) // ts), min(self.cols, (int(rect.right) - 1) // ts + 1)):
+                self.dirty.add((col, row))
+
+    def _bake(self, col, row):
+        ts = self.tile_size
+        tile_rect = pygame.Rect(col * ts, row * ts, ts, ts)
+        # a new surface rather than a cleared one: scaled copies of the old tile (view.py) go with it
+        tile = pygame.Surface((ts, ts), pygame.SRCALPHA)
+        self.tiles[(col, row)] = tile
+        for layer in self.layers:
+            for obj in layer.query(tile_rect):
+                if obj.rect.colliderect(tile_rect):
+                    obj.draw(tile, tile_rect.x, tile_rect.y)
+        self.dirty.discard((col, row))
+        self.bakes += 1
+        return tile
+
+    def draw(self, surf, camera_x, camera_y):
+        """Blit the tiles under the camera; returns how many were drawn."""
+        ts = self.tile_size
+        view_w, view_h = surf.get_size()
+        drawn = 0
+        for row in range(max(0, camera_y // ts), min(self.rows, (camera_y + view_h - 1) // ts + 1)):
+            for col in range(max(0, camera_x // ts), min(self.cols, (camera_x + view_w - 1) // ts + 1)):
+                if (col, row) in self.dirty:
+                    tile = self._bake(col, row)
+                else:
+                    tile = self.tiles[(col, row)]
+                surf.blit(tile, (col * ts - camera_x, row * ts - camera_y))
+                drawn += 1
+        return drawn
@@ -0,0 +1,27 @@
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # images are loaded relative to the working directory
+
+import game  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def level_path(tmp_path_factory):
+    """Level 1 with the images this checkout lacks drawn with cliff.png, in a headless game."""
+    with open(os.path.join("levels", "level1.json")) as f:
+        level = json.load(f)
+    for kind in ("blocks", "climbables"):
+        for entries in level[kind].values():
+            for entry in entries:
+                if entry.get("image") and not os.path.exists(entry["image"]):
+                    entry["image"] = "cliff.png"
+    path = tmp_path_factory.mktemp("levels") / "level1.json"
+    path.write_text(json.dumps(level))
+    game.init(headless=True, level_path=str(path))
+    return str(path)
@@ -0,0 +1,41 @@
+import numpy as np
+import pygame
+
+import game
+from laser_field import LaserField
+
+
+def _brute_next_safe(lasers, rect, now_ms, timeline, horizon):
+    """First ms from now_ms on which no laser overlapping rect is on, or None within horizon."""
+    lasers = [laser for laser in lasers if laser.rect.colliderect(rect)]
+    for when in range(now_ms, now_ms + horizon):
+        if not any(laser.update_and_check_collision(when, rect, timeline) for laser in lasers):
+            return when
+    return None
+
+
+def test_next_safe_matches_brute_force():
+    # mixed periods on the level's 500 ms grid, plus a few odd ones, so some gaps only
+    # open after many on-phases and some stacks of lasers never leave one
+    rng = np.random.default_rng(0)
+    rect = pygame.Rect(0, 0, 40, 40)
+    durations = [500, 1000, 1500, 2000, 2500, 700, 1300]
+    for _ in range(150):
+        lasers = [game.Laser(pygame.Rect(0, 0, 40, 40),
+                             off_duration=int(rng.choice(durations[:3])),
+                             warning_duration=int(rng.choice([0, 500])),
+                             on_duration=int(rng.choice(durations)),
+                             start_offset=int(rng.integers(0, 3000)))
+                  for _ in range(rng.integers(1, 5))]
+        field = LaserField(lasers)
+        now = int(rng.integers(0, 10000))
+        expected = _brute_next_safe(lasers, rect, now, "present", int(np.lcm.reduce(field.cycle)))
+        assert field.next_safe(rect, now, "present") == expected
+
+
+def test_next_safe_ignores_lasers_elsewhere():
+    laser = game.Laser(pygame.Rect(0, 0, 40, 40), off_duration=0, warning_duration=0, on_duration=1000)
+    field = LaserField([laser])
+    assert field.next_safe(pygame.Rect(100, 100, 40, 40), 123, "present") == 123
+    assert field.next_safe(pygame.Rect(0, 0, 40, 40), 123, "past") == 123
+    assert field.next_safe(pygame.Rect(0, 0, 40, 40), 123, "present") is None
@@ -0,0 +1,28 @@
+import pygame
+
+import replay
+
+
+def test_presses_keep_their_order_and_repeats(tmp_path):
+    # a slow frame hands every KEYDOWN it saw to one tick
+    ticks = [
+        ({pygame.K_d}, [pygame.K_e, pygame.K_s]),
+        ({pygame.K_d}, [pygame.K_s, pygame.K_s]),
+        ({pygame.K_d}, [pygame.K_s, pygame.K_s]),
+        ({pygame.K_a, replay.REWIND_KEY}, []),
+        (set(), [pygame.K_q, pygame.K_r, pygame.K_e, pygame.K_q]),
+    ]
+    recorder = replay.Recorder(60, "levels/level1.json")
+    for held, pressed in ticks:
+        keys = {key: key in held for key in (*replay.HELD_KEYS, replay.REWIND_KEY)}
+        recorder.record(keys, pressed)
+    path = tmp_path / "run.clk"
+    recorder.save(path)
+    sim_hz, level, inputs = replay.load(path)
+    assert sim_hz == 60 and level[0] == "levels/level1.json"
+    assert inputs == ticks
+
+
+def test_loads_version_2():
+    _, _, inputs = replay.load("recordings/level1.clk")
+    assert inputs and all(pressed == sorted(set(pressed), key=replay.PRESS_KEYS.index) for _, pressed in inputs)
@@ -0,0 +1,113 @@
+import numpy as np
+
+import game
+from vec_env import ACTIONS, AXE_H, PLAYER_H, SEED_SIZE, STAR_SIZE, VecEnv
+
+
+def _starts(env, rng):
+    """Put the instances at the spawn and next to the lasers, seeds, axe, trees and star, so
+    the random inputs die, pick up, plant, chop and win instead of only walking about."""
+    spots = [(*env.spawn, env.start_past, False)]
+    left, _, _, bottom = env.lasers
+    spots += [(x - 40, y - PLAYER_H, False, False) for x, y in zip(left, bottom)]
+    spots += [(x, y + SEED_SIZE - PLAYER_H, True, False) for x, y in env.seed_origin]
+    spots.append((env.axe_x, env.axe_y + AXE_H - PLAYER_H, False, False))
+    spots += [(x, y - PLAYER_H, True, True) for x, y, *_ in env.level["trees"]]
+    spots.append((env.star_x - 80, env.star_y + STAR_SIZE - PLAYER_H, False, True))
+    for i in range(env.n):
+        x, y, past, axe = spots[i % len(spots)]
+        env.x[i] = x + rng.integers(-30, 30)
+        env.y[i] = y
+        env.past[i] = past
+        env.axe[i] = axe
+    return [env.snapshot(i) for i in range(env.n)]
+
+
+def _random_actions(rng, ticks, n):
+    # each instance keeps an action for a while (about 7 ticks) so it gets somewhere
+    actions = np.empty((ticks, n), dtype=np.int64)
+    current = rng.integers(0, len(ACTIONS), n)
+    for tick in range(ticks):
+        current = np.where(rng.random(n) < 0.15, rng.integers(0, len(ACTIONS), n), current)
+        actions[tick] = current
+    return actions
+
+
+def _play(level_path, n=80, ticks=600, seed=0):
+    """Step VecEnv on seeded random inputs; returns the start snapshots, the actions and,
+    per tick, what the instances looked like after it."""
+    env = VecEnv(level_path, n=n, max_steps=ticks + 1)
+    rng = np.random.default_rng(seed)
+    starts = _starts(env, rng)
+    actions = _random_actions(rng, ticks, n)
+    steps = []
+    for tick in range(ticks):
+        _, rewards, terminated, _ = env.step(actions[tick])
+        steps.append({
+            "snapshots": [env.snapshot(i) for i in range(n)],
+            "rewards": rewards,
+            "terminated": terminated,
+            "seed_held": env.picked.any(axis=1),
+            "axe": env.axe.copy(),
+            "trees_in_world": env.trees_in_world[:, None] & env.alive,
+            "alive": env.alive.copy(),
+            "beanstalks": env.trunk.copy(),
+        })
+    return starts, actions, steps
+
+
+def _replay(starts, actions, steps, check):
+    """Run every instance through game.simulate_tick and call check(i, step, where) after each
+    tick it survives; returns how many instances won or died, after checking that VecEnv
+    ended them the same way."""
+    keys = game.HeldKeys()
+    ended = 0
+    for i, start in enumerate(starts):
+        game.new_game()
+        game.restore_snapshot(start)
+        for tick, step in enumerate(steps):
+            held, press = ACTIONS[actions[tick, i]]
+            keys.keys = set(held)
+            game.simulate_tick(keys, [press] if press else [])
+            where = f"instance {i}, tick {tick + 1}"
+            if game.victory or game.player.dead:
+                # the instance was reset inside step(), so only the outcome is left to compare
+                assert step["terminated"][i], where
+                assert step["rewards"][i] == (1 if game.victory else -1), where
+                ended += 1
+                break
+            assert not step["terminated"][i], where
+            check(i, step, where)
+    return ended
+
+
+def _rounded(snapshot):
+    return [round(v, 6) if isinstance(v, float) else v for v in snapshot]
+
+
+def test_matches_simulate_tick(level_path):
+    def check(i, step, where):
+        assert _rounded(step["snapshots"][i]) == _rounded(game.take_snapshot()), where
+
+    assert _replay(*_play(level_path), check)  # some instances died or won, so outcomes were compared too
+
+
+def test_matches_trigger_driven_systems(level_path):
+    # the HUD, tree membership, chopped trees' linked blocks and beanstalks only change when
+    # the game emits a trigger; VecEnv updates them every tick, so both must agree throughout
+    def check(i, step, where):
+        expected = (["seed"] if step["seed_held"][i] else []) + (["axe"] if step["axe"][i] else [])
+        assert game.hud_items == expected, where
+        for t, tree in enumerate(game.trees):
+            assert (tree.support in game.past_objects) == step["trees_in_world"][i, t], where
+            assert (tree.trunk in game.climbables_past) == step["trees_in_world"][i, t], where
+            for layer, block in tree.linked_blocks:
+                assert (block in layer) == step["alive"][i, t], where
+        for s, seed in enumerate(game.seeds_past):
+            grown = seed.tree_trunk is not None and seed.tree_trunk in game.climbables_present
+            assert grown == step["beanstalks"][i, s], where
+
+    starts, actions, steps = _play(level_path, seed=1)
+    assert _replay(starts, actions, steps, check)
+    # _replay matched each of these to a game ended by entering the star's region
+    assert any((step["rewards"] > 0).any() for step in steps)
@@ -0,0 +1,66 @@
+import pygame
+from collections import OrderedDict
+
+
+# -------------------------
+# Fonts
+# -------------------------
+class FontRegistry:
+    """Loads each (face, size) once. face=None is pygame's default font."""
+
+    def __init__(self):
+        self._fonts = {}
+
+    def get(self, face=None, size=20, system=False):
+        key = (face, size, system)
+        font = self._fonts.get(key)
+        if font is None:
+            font = pygame.font.SysFont(face, size) if system else pygame.font.Font(face, size)
+            self._fonts[key] = font
+        return font
+
+
+# -------------------------
+# Rendered text cache
+# -------------------------
+class TextCache:
+    """LRU cache of rendered strings keyed by (text, color, font)."""
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def render(self, font, text, color, antialias=True):
+        key = (text, color, font, antialias)
+        surf = self._entries.get(key)
+        if surf is not None:
+            self._entries.move_to_end(key)
+            return surf
+        surf = font.render(text, antialias, color)
+        self._entries[key] = surf
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return surf
+
+
+# -------------------------
+# Debug overlay
+# -------------------------
+class DebugOverlay:
+    """Named lines of debug text that are only re-rendered when they change."""
+
+    def __init__(self, font, color=(220, 220, 220)):
+        self.font = font
+        self.color = color
+        self.fields = {}
+
+    def set(self, name, text, pos):
+        field = self.fields.get(name)
+        if field is not None and field[0] == text:
+            field[1] = pos
+            return
+        self.fields[name] = [text, pos, self.font.render(text, True, self.color)]
+
+    def draw(self, surf):
+        for text, pos, rendered in self.fields.values():
+            surf.blit(rendered, pos)
@@ -0,0 +1,72 @@
+from collections import Counter
+
+from spatial import SpatialGrid
+
+
+# -------------------------
+# Triggers
+# -------------------------
+TIMELINE_CHANGED = "timeline.changed"  # timeline
+ITEM_PICKED = "item.picked"  # item ("seed"/"axe"), obj
+SEED_PLACED = "seed.placed"  # seed, grows
+TREE_CHOPPED = "tree.chopped"  # tree
+REGION_ENTERED = "region.entered"  # region
+
+
+class Region:
+    __slots__ = ("name", "rect")
+
+    def __init__(self, name, rect):
+        self.name = name
+        self.rect = rect
+
+
+class Triggers:
+    """Gameplay events handed to the systems that care about them.
+
+    subscribe(kind, fn) registers fn(**fields) for one kind of event and
+    emit(kind, **fields) calls the subscribers of that kind in the order they
+    subscribed, so a system runs when the state it depends on changes
+    instead of polling it every tick.
+
+    Regions are named rects kept in a SpatialGrid. update_regions(rect)
+    emits REGION_ENTERED for every region rect has started to overlap since
+    the previous call; it only tests the regions near rect, so its cost does
+    not grow with the number of regions. After a teleport (respawn, rewind)
+    call forget_regions() so regions the rect is already in fire again.
+    """
+
+    def __init__(self, world_width, world_height, cell_size=100):
+        self._subscribers = {}
+        self.grid = SpatialGrid(world_width, world_height, cell_size)
+        self.inside = set()
+        self.counts = Counter()  # emitted per kind
+
+    def subscribe(self, kind, fn):
+        self._subscribers.setdefault(kind, []).append(fn)
+
+    def emit(self, kind, **fields):
+        self.counts[kind] += 1
+        for fn in self._subscribers.get(kind, ()):
+            fn(**fields)
+
+    def add_region(self, name, rect):
+        region = Region(name, rect)
+        self.grid.insert(region)
+        return region
+
+    def remove_region(self, region):
+        self.grid.remove(region)
+        self.inside.discard(region)
+
+    def update_regions(self, rect):
+        inside = [region for region in self.grid.query(rect) if rect.colliderect(region.rect)]
+        if not inside and not self.inside:
+            return
+        entered = [region for region in inside if region not in self.inside]
+        self.inside = set(inside)
+        for region in entered:
+            self.emit(REGION_ENTERED, region=region)
+
+    def forget_regions(self):
+        self.inside = set()
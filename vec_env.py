@@ -0,0 +1,413 @@
+"""Vectorized multi-agent environment.
+
+VecEnv runs N independent games of one level as NumPy arrays (player
+position, velocity and flags, timeline, items, trees) and steps them all at
+once, for training bots and stress testing. It does not use Player or the
+world layers: each tick is re-implemented on the arrays with the same rules,
+numbers and order as game.simulate_tick and the systems its triggers run
+(key presses, where a swap to the present grows the planted beanstalks and
+a chop takes away the tree's linked blocks; then lasers, the star region,
+Player.update and, at the end of a tick that swapped, tree membership), so
+an instance moves the way the real game would. tests/test_vec_env.py plays
+both on the same random inputs and compares them every tick.
+
+    env = VecEnv("levels/level1.json", n=1024)
+    obs = env.reset()
+    obs, rewards, terminated, truncated = env.step(actions)  # actions: (n,) indices into ACTIONS
+
+Episodes end on reaching the star (reward 1), dying (reward -1) or after
+max_steps; finished instances are reset inside step(). snapshot(i) returns
+instance i in the game.take_snapshot() format, and render(i) draws it with
+the real renderer (after game.init()).
+
+    python vec_env.py --envs 4096 --steps 500      # random-action throughput
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pygame
+
+import game
+from level import load_level
+
+# (held keys, key pressed on the first tick or None), as in solve.py
+ACTIONS = [
+    ((), None),
+    ((pygame.K_a,), None),
+    ((pygame.K_d,), None),
+    ((pygame.K_w,), None),
+    ((pygame.K_a, pygame.K_w), None),
+    ((pygame.K_d, pygame.K_w), None),
+    ((), pygame.K_s),
+    ((), pygame.K_q),
+    ((), pygame.K_e),
+]
+PLAYER_W, PLAYER_H = 32, 48
+SEED_SIZE = 32
+BEANSTALK_W, BEANSTALK_H = 40, 250
+AXE_W, AXE_H = 40, 50
+STAR_SIZE = 40
+
+
+def _boxes(rects):
+    rects = list(rects)
+    return tuple(np.array([getattr(r, side) for r in rects], dtype=np.int64)
+                 for side in ("left", "top", "right", "bottom"))
+
+
+def _overlap(x, y, w, h, left, top, right, bottom):
+    # Rect.colliderect for arrays that broadcast together
+    return (x < right) & (x + w > left) & (y < bottom) & (y + h > top) & (right > left) & (bottom > top)
+
+
+def _round(v):
+    # what assigning a float to a pygame.Rect coordinate does: round half away from zero
+    return np.copysign(np.floor(np.abs(v) + 0.5), v).astype(np.int64)
+
+
+class VecEnv:
+    """N copies of a level stepped together; see the module docstring."""
+
+    def __init__(self, level_path=game.LEVEL_PATH, n=256, max_steps=3600, ticks_per_step=1):
+        self.n = n
+        self.max_steps = max_steps
+        self.ticks_per_step = ticks_per_step
+        level = self.level = load_level(level_path)
+        self.world_w, self.world_h = level["world"]
+        self.spawn = level["spawn"]
+        self.start_past = level["timeline"] == "past"
+
+        # blocks of both timelines in the order the world layers iterate them; tree tops and
+        # supports come after the past level blocks and only count while their tree is in the world
+        rects, past, tree_of, link_of = [], [], [], []
+        links = {(timeline, i): tree for tree, (timeline, i) in level["links"]}
+        for timeline in ("past", "present"):
+            for i, (rect, image) in enumerate(level["blocks"][timeline]):
+                rects.append(pygame.Rect(rect))
+                past.append(timeline == "past")
+                tree_of.append(-1)
+                link_of.append(links.get((timeline, i), -1))
+            if timeline == "past":
+                for t, (x, y, height, width, trunk, top) in enumerate(level["trees"]):
+                    if top:
+                        top_w, top_h = game.Tree.top_size(width, height)
+                        rects.append(pygame.Rect(x - top_w / 3, y - height - top_h / 2, top_w, top_h))
+                        past.append(True), tree_of.append(t), link_of.append(-1)
+                    rects.append(pygame.Rect(x + width / 2 - 2.5, y - height, 5, height))
+                    past.append(True), tree_of.append(t), link_of.append(-1)
+        self.blocks = _boxes(rects)
+        self.block_past = np.array(past, dtype=bool)
+        self.block_tree = np.array(tree_of, dtype=np.int64)
+        self.block_link = np.array(link_of, dtype=np.int64)
+
+        # climbables: the level's, then the tree trunks (past); beanstalks are per instance
+        rects, past, tree_of = [], [], []
+        for timeline in ("past", "present"):
+            for rect, image in level["climbables"][timeline]:
+                rects.append(pygame.Rect(rect))
+                past.append(timeline == "past")
+                tree_of.append(-1)
+        trunks = [pygame.Rect(x, y - height, width, height) for x, y, height, width, trunk, top in level["trees"]]
+        for t, rect in enumerate(trunks):
+            rects.append(rect)
+            past.append(True)
+            tree_of.append(t)
+        self.climbables = _boxes(rects)
+        self.climbable_past = np.array(past, dtype=bool)
+        self.climbable_tree = np.array(tree_of, dtype=np.int64)
+        # the reach of the axe around each trunk
+        self.chop_zones = _boxes(rect.inflate(50, 0) for rect in trunks)
+
+        lasers = level["lasers"]
+        self.lasers = _boxes(pygame.Rect(rect) for rect, *_ in lasers)
+        self.laser_start = np.array([offset for *_, offset in lasers], dtype=np.int64)
+        self.laser_cycle = np.array([off + warning + on for _, _, off, warning, on, _, _ in lasers], dtype=np.int64)
+        self.laser_on = np.array([off + warning for _, _, off, warning, *_ in lasers], dtype=np.int64)
+        self.laser_past = np.array(["past" in timelines for *_, timelines, _ in lasers], dtype=bool)
+        self.laser_present = np.array(["present" in timelines for *_, timelines, _ in lasers], dtype=bool)
+
+        self.seed_origin = np.array(level["seeds"], dtype=np.int64).reshape(-1, 2)
+        self.axe_x, self.axe_y = level["axe"]
+        self.star_x, self.star_y = level["star"]
+
+        n_seeds, n_trees = len(self.seed_origin), len(level["trees"])
+        self.held = np.array([[pygame.K_a in held, pygame.K_d in held, pygame.K_w in held] for held, _ in ACTIONS])
+        self.press = np.array([press or 0 for _, press in ACTIONS])
+
+        self.x = np.zeros(n, dtype=np.int64)
+        self.y = np.zeros(n, dtype=np.int64)
+        self.vx = np.zeros(n, dtype=np.int64)
+        self.vy = np.zeros(n, dtype=np.float64)
+        self.on_ground = np.zeros(n, dtype=bool)
+        self.climbing = np.zeros(n, dtype=bool)
+        self.dead = np.zeros(n, dtype=bool)
+        self.facing_right = np.zeros(n, dtype=bool)
+        self.past = np.zeros(n, dtype=bool)
+        self.trees_in_world = np.zeros(n, dtype=bool)  # tree blocks are in past_objects (updated at the end of a tick)
+        self.victory = np.zeros(n, dtype=bool)
+        self.axe = np.zeros(n, dtype=bool)
+        self.tick = np.zeros(n, dtype=np.int64)
+        self.steps = np.zeros(n, dtype=np.int64)
+        self.seed_x = np.zeros((n, n_seeds), dtype=np.int64)
+        self.seed_y = np.zeros((n, n_seeds), dtype=np.int64)
+        self.picked = np.zeros((n, n_seeds), dtype=bool)
+        self.pick_order = np.zeros((n, n_seeds), dtype=np.int64)  # inventory order
+        self.placed = np.zeros((n, n_seeds), dtype=bool)
+        self.grown = np.zeros((n, n_seeds), dtype=bool)
+        self.placed_present = np.zeros((n, n_seeds), dtype=bool)
+        self.trunk = np.zeros((n, n_seeds), dtype=bool)
+        self.alive = np.zeros((n, n_trees), dtype=bool)
+        self.reset()
+
+    # -------------------------
+    # Episodes
+    # -------------------------
+    def reset(self, mask=None):
+        """Start new games in the instances selected by mask (all by default); returns observe()."""
+        m = slice(None) if mask is None else mask
+        self.x[m], self.y[m] = self.spawn
+        self.vx[m] = 0
+        self.vy[m] = 0
+        for flag in (self.on_ground, self.climbing, self.dead, self.victory, self.axe, self.picked,
+                     self.placed, self.grown, self.placed_present, self.trunk):
+            flag[m] = False
+        self.facing_right[m] = True
+        self.past[m] = self.start_past
+        self.trees_in_world[m] = True  # new_game adds them; the first tick takes them out in the present
+        self.tick[m] = 0
+        self.steps[m] = 0
+        self.seed_x[m] = self.seed_origin[:, 0]
+        self.seed_y[m] = self.seed_origin[:, 1]
+        self.pick_order[m] = 0
+        self.alive[m] = True
+        return self.observe()
+
+    def step(self, actions):
+        """Advance every instance by ticks_per_step ticks with its action.
+
+        Returns (obs, rewards, terminated, truncated). Instances that
+        finished are reset, so their obs is already the next episode's.
+        """
+        actions = np.asarray(actions)
+        held = self.held[actions]
+        won = np.zeros(self.n, dtype=bool)
+        died = np.zeros(self.n, dtype=bool)
+        for tick in range(self.ticks_per_step):
+            running = ~(won | died)
+            self._tick(held & running[:, None], np.where(running & (tick == 0), self.press[actions], 0))
+            won |= self.victory & running
+            died |= self.dead & running & ~won
+        self.steps += 1
+        terminated = won | died
+        truncated = ~terminated & (self.steps >= self.max_steps)
+        rewards = won.astype(np.float32) - died.astype(np.float32)
+        done = terminated | truncated
+        if done.any():
+            self.reset(done)
+        return self.observe(), rewards, terminated, truncated
+
+    def observe(self):
+        """(n, k) float32: player x, y, vx, vy, on_ground, climbing, facing right, past, axe,
+        seconds played, then x, y, picked, placed, grown per seed and alive per tree."""
+        columns = [self.x, self.y, self.vx, self.vy, self.on_ground, self.climbing, self.facing_right,
+                   self.past, self.axe, self.tick * (game.SIM_DT_MS / 1000)]
+        parts = [np.stack(columns, axis=1).astype(np.float32)]
+        parts += [a.astype(np.float32) for a in (self.seed_x, self.seed_y, self.picked, self.placed, self.grown,
+                                                 self.alive)]
+        return np.concatenate(parts, axis=1)
+
+    # -------------------------
+    # One tick (game.simulate_tick on arrays)
+    # -------------------------
+    def _tick(self, held, press):
+        live = ~self.dead
+        self._swap(live & (press == pygame.K_s))
+        self._pick_up(press == pygame.K_q)
+        self._use(press == pygame.K_e)
+
+        self.tick += 1
+        now = (self.tick * game.SIM_DT_MS).astype(np.int64)
+
+        # beanstalks grow once their seed's timeline is the present (the game does it on TIMELINE_CHANGED)
+        self.trunk |= self.grown & ~self.past[:, None]
+
+        # lasers
+        if len(self.laser_start):
+            on = np.mod(now[:, None] - self.laser_start, self.laser_cycle) >= self.laser_on
+            active = np.where(self.past[:, None], self.laser_past, self.laser_present)
+            hit = on & active & _overlap(self.x[:, None], self.y[:, None], PLAYER_W, PLAYER_H, *self.lasers)
+            self.dead |= hit.any(axis=1)
+
+        self.victory |= _overlap(self.x, self.y, PLAYER_W, PLAYER_H, self.star_x, self.star_y,
+                                 self.star_x + STAR_SIZE, self.star_y + STAR_SIZE)
+
+        self._update_players(~self.dead, held)
+        self.trees_in_world = self.past.copy()
+
+    def _solid(self, past):
+        # (n, blocks) mask of the blocks in each instance's layer for the given timelines
+        tree = self.block_tree
+        in_world = (tree < 0) | (self.alive[:, np.maximum(tree, 0)] & self.trees_in_world[:, None])
+        link = self.block_link
+        linked = (link < 0) | self.alive[:, np.maximum(link, 0)]
+        return (self.block_past == past[:, None]) & in_world & linked
+
+    def _swap(self, m):
+        if not m.any():
+            return
+        self.past = np.where(m, ~self.past, self.past)
+        blocked = _overlap(self.x[:, None], self.y[:, None], PLAYER_W, PLAYER_H, *self.blocks) & self._solid(self.past)
+        self.dead |= m & blocked.any(axis=1)
+
+    def _pick_up(self, m):
+        if not m.any():
+            return
+        axe = m & ~self.past & ~self.axe & _overlap(self.x, self.y, PLAYER_W, PLAYER_H, self.axe_x, self.axe_y,
+                                                    self.axe_x + AXE_W, self.axe_y + AXE_H)
+        self.axe |= axe
+        sx, sy = self.seed_x, self.seed_y
+        can = (m & self.past)[:, None] & ~self.picked & ~self.placed & _overlap(
+            self.x[:, None], self.y[:, None], PLAYER_W, PLAYER_H, sx, sy, sx + SEED_SIZE, sy + SEED_SIZE)
+        # only the first such seed
+        first = can & (np.cumsum(can, axis=1) == 1)
+        self.picked |= first
+        self.pick_order = np.where(first, self.tick[:, None], self.pick_order)
+
+    def _use(self, m):
+        if not m.any():
+            return
+        chop = (m & self.axe & self.past)[:, None] & self.alive & _overlap(
+            self.x[:, None], self.y[:, None], PLAYER_W, PLAYER_H, *self.chop_zones)
+        self.alive &= ~chop
+
+        place = m & self.picked.any(axis=1) & self.on_ground
+        if not place.any():
+            return
+        # the seed picked up first, at the player's feet
+        order = np.where(self.picked, self.pick_order, np.iinfo(np.int64).max)
+        first = place[:, None] & (np.arange(self.picked.shape[1]) == order.argmin(axis=1)[:, None])
+        x = (self.x + PLAYER_W // 2 - SEED_SIZE // 2)[:, None]
+        y = (self.y + PLAYER_H + 1 - SEED_SIZE)[:, None]
+        self.seed_x = np.where(first, x, self.seed_x)
+        self.seed_y = np.where(first, y, self.seed_y)
+        self.placed |= first
+        self.picked &= ~first
+        in_past = self.past[:, None]
+        solid = self._solid(np.ones(self.n, dtype=bool))
+        touching = (_overlap(x, y, SEED_SIZE, SEED_SIZE, *self.blocks) & solid).any(axis=1)[:, None]
+        self.grown |= first & in_past & touching
+        self.placed_present |= first & ~in_past
+
+    def _update_players(self, live, held):
+        left, right, up = held[:, 0], held[:, 1], held[:, 2]
+
+        # Player.check_climb
+        cx, cy, cr, cb = self.climbables
+        tree = self.climbable_tree
+        climbable = (self.climbable_past == self.past[:, None]) & (
+            (tree < 0) | (self.alive[:, np.maximum(tree, 0)] & self.trees_in_world[:, None]))
+        in_climbable = (_overlap(self.x[:, None], self.y[:, None], PLAYER_W, PLAYER_H, cx, cy, cr, cb)
+                        & climbable).any(axis=1)
+        if self.trunk.shape[1]:
+            bx = self.seed_x + SEED_SIZE // 2 - BEANSTALK_W // 2
+            by = self.seed_y - BEANSTALK_H + 32
+            in_climbable |= (_overlap(self.x[:, None], self.y[:, None], PLAYER_W, PLAYER_H,
+                                      bx, by, bx + BEANSTALK_W, by + BEANSTALK_H)
+                             & self.trunk & ~self.past[:, None]).any(axis=1)
+        self.climbing = np.where(live, in_climbable & ~self.on_ground, self.climbing)
+
+        # Player.handle_input
+        vx = np.where(right, 4, np.where(left, -4, 0))
+        self.vx = np.where(live, vx, self.vx)
+        self.facing_right = np.where(live & right, True, np.where(live & left, False, self.facing_right))
+        jump = live & up & self.on_ground & ~self.climbing
+        self.vy = np.where(jump, -10.0, self.vy)
+        self.on_ground &= ~jump
+        self.vy = np.where(live & self.climbing, np.where(up, -3.0, 1.5), self.vy)
+
+        # Player.apply_gravity
+        falling = live & ~self.climbing
+        self.vy = np.where(falling, np.minimum(self.vy + 0.5, 10.0), self.vy)
+
+        # Player.move: blocks resolved one at a time in layer order
+        solid = self._solid(self.past) & live[:, None]
+        left_, top, right_, bottom = self.blocks
+        x = np.where(live, self.x + self.vx, self.x)
+        y = self.y
+        vx = self.vx
+        for j in range(len(left_)):
+            hit = solid[:, j] & _overlap(x, y, PLAYER_W, PLAYER_H, left_[j], top[j], right_[j], bottom[j])
+            x = np.where(hit & (vx > 0), left_[j] - PLAYER_W, np.where(hit & (vx < 0), right_[j], x))
+
+        y = np.where(live, _round(self.y + self.vy), self.y)
+        vy = self.vy
+        on_ground = self.on_ground & ~live
+        for j in range(len(left_)):
+            hit = solid[:, j] & _overlap(x, y, PLAYER_W, PLAYER_H, left_[j], top[j], right_[j], bottom[j])
+            land = hit & (vy > 0)
+            bump = hit & (vy < 0)
+            y = np.where(land, top[j] - PLAYER_H, np.where(bump, bottom[j], y))
+            on_ground |= land
+            vy = np.where(land | bump, 0.0, vy)
+
+        # world bounds
+        x = np.where(live, np.clip(x, 0, self.world_w - PLAYER_W), x)
+        y = np.where(live, np.maximum(y, 0), y)
+        floor = live & (y + PLAYER_H > self.world_h)
+        y = np.where(floor, self.world_h - PLAYER_H, y)
+        on_ground |= floor
+        vy = np.where(floor, 0.0, vy)
+        self.x, self.y, self.vy, self.on_ground = x, y, vy, on_ground
+
+    # -------------------------
+    # Looking at one instance
+    # -------------------------
+    def snapshot(self, i):
+        """Instance i as a game.take_snapshot() record, for game.restore_snapshot()."""
+        player_flags = (self.on_ground[i] | self.dead[i] << 1 | self.climbing[i] << 2 | self.facing_right[i] << 3)
+        world_flags = self.past[i] | self.victory[i] << 1 | self.victory[i] << 2 | self.axe[i] << 3
+        values = [int(self.tick[i]), int(self.x[i]), int(self.y[i]), float(self.vx[i]), float(self.vy[i]),
+                  int(player_flags), int(world_flags)]
+        for s in range(self.seed_x.shape[1]):
+            flags = (self.picked[i, s] | self.placed[i, s] << 1 | self.grown[i, s] << 2
+                     | self.placed_present[i, s] << 3 | self.trunk[i, s] << 4)
+            values += [int(self.seed_x[i, s]), int(self.seed_y[i, s]), int(flags)]
+        values += [bool(alive) for alive in self.alive[i]]
+        return values
+
+    def render(self, i=0):
+        """Draw instance i in the game window; game.init() must have loaded the same level."""
+        game.restore_snapshot(self.snapshot(i))
+        game.render(game.frame)
+        game.upscale_frame()
+        pygame.display.flip()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Random-action throughput of VecEnv")
+    parser.add_argument("level", nargs="?", default=game.LEVEL_PATH)
+    parser.add_argument("--envs", type=int, default=4096, help="instances stepped together (default: %(default)s)")
+    parser.add_argument("--steps", type=int, default=500, help="steps to time (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    env = VecEnv(args.level, n=args.envs)
+    rng = np.random.default_rng(args.seed)
+    actions = rng.integers(0, len(ACTIONS), size=(args.steps, args.envs))
+    episodes = wins = 0
+    start = time.perf_counter()
+    for step in range(args.steps):
+        obs, rewards, terminated, truncated = env.step(actions[step])
+        episodes += int(terminated.sum() + truncated.sum())
+        wins += int((rewards > 0).sum())
+    elapsed = time.perf_counter() - start
+    agent_steps = args.steps * args.envs
+    print(f"{agent_steps} agent-steps in {elapsed:.2f} s: {agent_steps / elapsed:,.0f}/s "
+          f"({args.envs} envs, {episodes} episodes ended, {wins} reached the star)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+import math
+import weakref
+
+import pygame
+
+
+# -------------------------
+# Scaled view
+# -------------------------
+class ViewScaler:
+    """Draws a fixed-size view onto surfaces of any size.
+
+    Draw code lays a frame out in width x height view pixels. wrap(surf)
+    returns surf itself when it is that size, otherwise a ScaledView that
+    scales every blit and fill onto it, so a lower internal resolution shows
+    the same part of the world, only with fewer pixels. Scaled copies of the
+    sources are cached per target size and kept until the source surface is
+    garbage collected: replace a source rather than redrawing it in place.
+    """
+
+    def __init__(self, width, height):
+        self.size = (width, height)
+        self._caches = {}  # target size -> WeakKeyDictionary(source -> {area: scaled copy})
+
+    def wrap(self, surface):
+        size = surface.get_size()
+        if size == self.size:
+            return surface
+        cache = self._caches.get(size)
+        if cache is None:
+            cache = self._caches[size] = weakref.WeakKeyDictionary()
+        return ScaledView(surface, self.size, cache)
+
+
+class ScaledView:
+    """Stands in for a Surface of the view size; see ViewScaler.wrap().
+
+    blit(), blits() and fill() are scaled onto the wrapped surface and
+    get_size(), get_width() and get_height() report the view size. Sources
+    are scaled up to whole pixels, so neighbouring tiles never leave a gap.
+    """
+
+    def __init__(self, surface, view_size, cache):
+        self.surface = surface
+        self.view_size = view_size
+        self.sx = surface.get_width() / view_size[0]
+        self.sy = surface.get_height() / view_size[1]
+        self._cache = cache
+
+    def get_size(self):
+        return self.view_size
+
+    def get_width(self):
+        return self.view_size[0]
+
+    def get_height(self):
+        return self.view_size[1]
+
+    def _scaled(self, source, area):
+        copies = self._cache.get(source)
+        if copies is None:
+            copies = self._cache[source] = {}
+        key = None if area is None else tuple(area)
+        scaled = copies.get(key)
+        if scaled is None:
+            part = source if area is None else source.subsurface(area)
+            w, h = part.get_size()
+            scaled = pygame.transform.smoothscale(part, (math.ceil(w * self.sx), math.ceil(h * self.sy)))
+            copies[key] = scaled
+        return scaled
+
+    def _item(self, source, dest, area=None):
+        return self._scaled(source, area), (round(dest[0] * self.sx), round(dest[1] * self.sy))
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        return self.surface.blit(*self._item(source, dest, area), special_flags=special_flags)
+
+    def blits(self, blit_sequence, doreturn=True):
+        return self.surface.blits([self._item(*item) for item in blit_sequence], doreturn=doreturn)
+
+    def fill(self, color, rect=None, special_flags=0):
+        if rect is not None:
+            rect = pygame.Rect(rect)
+            left, top = round(rect.left * self.sx), round(rect.top * self.sy)
+            right, bottom = round(rect.right * self.sx), round(rect.bottom * self.sy)
+            # a 1px laser beam stays visible at any scale
+            rect = pygame.Rect(left, top, max(right - left, min(rect.w, 1)), max(bottom - top, min(rect.h, 1)))
+        return self.surface.fill(color, rect, special_flags)
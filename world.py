@@ -0,0 +1,56 @@
+from spatial import SpatialGrid
+
+
+# -------------------------
+# World layer
+# -------------------------
+class WorldLayer:
+    """Registry of the world entities (Blocks or Climbables) for one timeline.
+
+    Membership has set semantics: adding an entity that is already present
+    is a no-op and discard removes it completely, so per-frame add/remove
+    calls cannot make the world grow. add, discard and ``in`` are O(1) and
+    iteration follows insertion order. A SpatialGrid is kept in sync so
+    collision code can ask for just the entities near a rect.
+
+    Callables in ``listeners`` are called with the entity whenever one is
+    actually added or discarded (used to rebake cached layer tiles).
+    """
+
+    def __init__(self, world_width, world_height, entities=(), cell_size=100):
+        self._items = {}
+        self.grid = SpatialGrid(world_width, world_height, cell_size)
+        self.peak = 0
+        self.listeners = []
+        for obj in entities:
+            self.add(obj)
+
+    def add(self, obj):
+        if obj in self._items:
+            return
+        self._items[obj] = None
+        self.grid.insert(obj)
+        if len(self._items) > self.peak:
+            self.peak = len(self._items)
+        for listener in self.listeners:
+            listener(obj)
+
+    def discard(self, obj):
+        if obj not in self._items:
+            return
+        del self._items[obj]
+        self.grid.remove(obj)
+        for listener in self.listeners:
+            listener(obj)
+
+    def query(self, rect):
+        return self.grid.query(rect)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, obj):
+        return obj in self._items